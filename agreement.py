@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+
+
+# ======================================================
+# INTEGER CODING
+# ======================================================
+def encode(values, mapping):
+    """
+    Integer codes of `values` under `mapping` (value -> code), extending the
+    mapping with values it has not seen. Only the distinct values are looped
+    over; the rows themselves are mapped in one vectorized pass.
+    """
+    values = pd.Series(values, dtype=object)
+    for v in pd.unique(values):
+        mapping.setdefault(v, len(mapping))
+    return values.map(mapping).to_numpy(np.int64)
+
+
+def categories(mapping):
+    return [v for v, _ in sorted(mapping.items(), key=lambda kv: kv[1])]
+
+
+# ======================================================
+# KAPPA
+# ======================================================
+def fleiss_kappa(items, codes, n_categories):
+    """
+    Fleiss' kappa over (item, category) ratings, allowing a different number
+    of raters per item. Items with fewer than two ratings are ignored.
+    Returns (kappa, items used); kappa is NaN when chance agreement is total.
+    """
+    _, items = np.unique(items, return_inverse=True)
+    n_items = items.max() + 1 if len(items) else 0
+    counts = np.bincount(items * n_categories + codes, minlength=n_items * n_categories)
+    counts = counts.reshape(n_items, n_categories)
+    counts = counts[counts.sum(axis=1) >= 2]
+    if not len(counts):
+        return np.nan, 0
+
+    n = counts.sum(axis=1)
+    per_item = ((counts * counts).sum(axis=1) - n) / (n * (n - 1))
+    p = counts.sum(axis=0) / n.sum()
+    expected = (p * p).sum()
+    if expected == 1.0:
+        return np.nan, len(counts)
+    return (per_item.mean() - expected) / (1.0 - expected), len(counts)
+
+
+def rating_pairs(items, annotators, codes):
+    """
+    Every pair of ratings two different annotators gave the same item, as
+    arrays (annotator_a, annotator_b, code_a, code_b) with annotator_a <
+    annotator_b. Built by comparing the sorted ratings with shifted copies
+    of themselves, one shift per extra rater.
+    """
+    order = np.lexsort((annotators, items))
+    items, annotators, codes = items[order], annotators[order], codes[order]
+    max_raters = np.bincount(np.unique(items, return_inverse=True)[1]).max() if len(items) else 0
+
+    a, b, ca, cb = [], [], [], []
+    for shift in range(1, max_raters):
+        same = (items[:-shift] == items[shift:]) & (annotators[:-shift] != annotators[shift:])
+        left, right = np.flatnonzero(same), np.flatnonzero(same) + shift
+        a.append(annotators[left])
+        b.append(annotators[right])
+        ca.append(codes[left])
+        cb.append(codes[right])
+    if not a:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    return np.concatenate(a), np.concatenate(b), np.concatenate(ca), np.concatenate(cb)
+
+
+def pairwise_confusion(a, b, ca, cb, n_categories):
+    """Confusion matrices of each annotator pair: (pairs as [[a, b], ...], matrices of shape (P, K, K))."""
+    pairs, pair_index = np.unique(np.stack([a, b], axis=1), axis=0, return_inverse=True)
+    pair_index = pair_index.ravel()
+    k = n_categories
+    matrices = np.bincount(
+        pair_index * k * k + ca * k + cb, minlength=len(pairs) * k * k
+    ).reshape(len(pairs), k, k)
+    return pairs, matrices
+
+
+def cohen_kappa(matrices):
+    """Cohen's kappa of each (K, K) confusion matrix in a (P, K, K) stack."""
+    n = matrices.sum(axis=(1, 2)).astype(np.float64)
+    observed = np.trace(matrices, axis1=1, axis2=2) / n
+    expected = (matrices.sum(axis=2) * matrices.sum(axis=1)).sum(axis=1) / (n * n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected < 1.0, (observed - expected) / (1.0 - expected), np.nan)
+
+
+# ======================================================
+# ACCUMULATOR
+# ======================================================
+class AgreementAccumulator:
+    """
+    Inter-annotator agreement per label, fed one page of annotations at a time.
+
+    Each page is reduced to integer-coded (item, annotator, label) arrays for
+    the posts that more than one annotator labelled; everything else is
+    dropped, so memory grows with the overlap and not with the corpus. Blank
+    labels (questions skipped for non-memes) are not ratings.
+    """
+
+    def __init__(self, labels):
+        self.labels = list(labels)
+        self._annotators = {}
+        self._values = {label: {} for label in self.labels}
+        self._ratings = {label: [] for label in self.labels}     # [(items, annotators, codes)]
+        self._items = 0
+
+    def add(self, frame):
+        """Add one page's annotations (one row per post and annotator)."""
+        if not len(frame):
+            return
+        local = encode(frame["post_id"].astype(str), {})
+        shared = np.bincount(local)[local] >= 2
+        items = local[shared] + self._items
+        self._items += local.max() + 1
+        if not shared.any():
+            return
+
+        annotators = encode(frame["annotator"].to_numpy()[shared], self._annotators)
+        for label in self.labels:
+            values = frame[label].fillna("").astype(str).to_numpy()[shared]
+            rated = values != ""
+            if rated.sum() < 2:
+                continue
+            codes = encode(values[rated], self._values[label])
+            self._ratings[label].append((items[rated], annotators[rated], codes))
+
+    def _arrays(self, label):
+        parts = self._ratings[label]
+        if not parts:
+            return None
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    # ---------------- reports ----------------
+    def summary(self):
+        """One row per label: Fleiss' kappa, mean pairwise Cohen's kappa and how much data they rest on."""
+        rows = []
+        for label in self.labels:
+            arrays = self._arrays(label)
+            if arrays is None:
+                rows.append({"label": label, "items": 0, "ratings": 0, "fleiss_kappa": np.nan,
+                             "cohen_kappa_mean": np.nan, "annotator_pairs": 0})
+                continue
+            items, annotators, codes = arrays
+            k = len(self._values[label])
+            fleiss, n_items = fleiss_kappa(items, codes, k)
+            pairs, matrices = pairwise_confusion(*rating_pairs(items, annotators, codes), k)
+            kappas = cohen_kappa(matrices)
+            weights = matrices.sum(axis=(1, 2))
+            valid = ~np.isnan(kappas)
+            rows.append({
+                "label": label,
+                "items": n_items,
+                "ratings": len(codes),
+                "fleiss_kappa": fleiss,
+                "cohen_kappa_mean": np.average(kappas[valid], weights=weights[valid]) if valid.any() else np.nan,
+                "annotator_pairs": len(pairs),
+            })
+        return pd.DataFrame(rows)
+
+    def pairs(self):
+        """Cohen's kappa of every annotator pair on every label they both rated."""
+        names = categories(self._annotators)
+        frames = []
+        for label in self.labels:
+            arrays = self._arrays(label)
+            if arrays is None:
+                continue
+            items, annotators, codes = arrays
+            pairs, matrices = pairwise_confusion(*rating_pairs(items, annotators, codes), len(self._values[label]))
+            if not len(pairs):
+                continue
+            frames.append(pd.DataFrame({
+                "label": label,
+                "annotator_a": np.asarray(names, dtype=object)[pairs[:, 0]],
+                "annotator_b": np.asarray(names, dtype=object)[pairs[:, 1]],
+                "items": matrices.sum(axis=(1, 2)),
+                "cohen_kappa": cohen_kappa(matrices),
+            }))
+        columns = ["label", "annotator_a", "annotator_b", "items", "cohen_kappa"]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    def confusion(self, label):
+        """
+        Pooled confusion matrix of `label` over all annotator pairs, counted
+        in both directions so it is symmetric (rows and columns are values).
+        """
+        arrays = self._arrays(label)
+        values = categories(self._values[label])
+        if arrays is None:
+            return pd.DataFrame(0, index=values, columns=values)
+        _, matrices = pairwise_confusion(*rating_pairs(*arrays), len(values))
+        pooled = matrices.sum(axis=0)
+        return pd.DataFrame(pooled + pooled.T, index=values, columns=values)
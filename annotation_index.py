@@ -0,0 +1,92 @@
+import threading
+import time
+
+
+# ======================================================
+# ANNOTATION INDEX
+# ======================================================
+class AnnotationIndex:
+    """
+    Process-wide view of which posts are already annotated on each page.
+
+    The store is read in full once; after that only the rows appended since
+    the last cursor are pulled, so a rerun costs one small range read
+    instead of a full `get_all_records()` download. With a sharded store
+    each page keeps its own cursor and only the page being worked on is read.
+    """
+
+    def __init__(self, store, refresh_interval=5.0, required_labels=None):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        # post_id -> number of distinct annotators a post needs (overlap items need more than one)
+        self.required_labels = required_labels or (lambda post_id: 1)
+
+        self._lock = threading.Lock()
+        self._cursors = {}           # scope -> store position of the last row read
+        self._last_refresh = {}      # scope -> monotonic time of the last read
+        self._labels = {}            # page_name -> {post_id: set(annotator)}
+        self._complete = {}          # page_name -> set(post_id) with enough labels
+        self._by_annotator = {}      # (page_name, annotator) -> set(post_id)
+
+    # ---------------- reading ----------------
+    def refresh(self, force=False, page_name=None):
+        """
+        Pull new rows from the store; returns False when throttled by
+        `refresh_interval`. A sharded store reads only `page_name`'s rows.
+        """
+        scope = page_name if self.store.sharded else None
+        with self._lock:
+            now = time.monotonic()
+            if (not force and scope in self._cursors
+                    and now - self._last_refresh[scope] < self.refresh_interval):
+                return False
+
+            if scope is None:
+                rows, cursor = self.store.read_since(self._cursors.get(scope))
+            else:
+                rows, cursor = self.store.read_page_since(scope, self._cursors.get(scope))
+            self._cursors[scope] = cursor
+            for row_page, post_id, annotator, *_ in rows:
+                if row_page and post_id not in (None, ""):
+                    self._add(row_page, str(post_id), annotator)
+            self._last_refresh[scope] = now
+            return True
+
+    def _add(self, page_name, post_id, annotator):
+        annotators = self._labels.setdefault(page_name, {}).setdefault(post_id, set())
+        annotators.add(annotator)
+        self._by_annotator.setdefault((page_name, annotator), set()).add(post_id)
+        if len(annotators) >= self.required_labels(post_id):
+            self._complete.setdefault(page_name, set()).add(post_id)
+
+    # ---------------- local writes ----------------
+    def mark_done(self, page_name, post_id, annotator):
+        # Makes our own submission visible immediately; the row is picked up
+        # again on the next incremental refresh, which is a no-op for a set.
+        with self._lock:
+            self._add(page_name, str(post_id), annotator)
+
+    # ---------------- queries ----------------
+    def done_ids(self, page_name):
+        """Posts with at least one annotation."""
+        with self._lock:
+            return frozenset(self._labels.get(page_name, ()))
+
+    def is_done(self, page_name, post_id):
+        with self._lock:
+            return str(post_id) in self._labels.get(page_name, ())
+
+    def label_count(self, page_name, post_id):
+        with self._lock:
+            return len(self._labels.get(page_name, {}).get(str(post_id), ()))
+
+    def unavailable_for(self, page_name, annotator):
+        """Posts `annotator` should not be offered: fully labelled, or already labelled by them."""
+        with self._lock:
+            return self._complete.get(page_name, set()) | self._by_annotator.get((page_name, annotator), set())
+
+    def is_unavailable(self, page_name, post_id, annotator):
+        with self._lock:
+            post_id = str(post_id)
+            return (post_id in self._complete.get(page_name, ())
+                    or post_id in self._by_annotator.get((page_name, annotator), ()))
@@ -0,0 +1,559 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+from perf import timed
+
+ANNOTATION_COLUMNS = [
+    "page_name", "post_id", "annotator", "meme", "sentiment", "intent",
+    "cyberbullying", "target", "protected_group", "harm", "harmfulness",
+    "emotion", "modality", "timestamp",
+]
+
+SHEETS_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# worksheet title prefixes of per-page shards and of archived (closed) pages
+SHARD_PREFIX = "page_"
+ARCHIVE_PREFIX = "archive_"
+
+
+# ======================================================
+# STORE INTERFACE
+# ======================================================
+class AnnotationStore:
+    """
+    Where annotation rows live. Rows are lists in ANNOTATION_COLUMNS order.
+
+    `read_since(cursor)` returns the rows appended after `cursor` together
+    with a new cursor; pass `None` to read everything. Cursors are opaque to
+    callers and only valid for the store that produced them.
+
+    Sharded stores keep each page apart and also offer
+    `read_page_since(page_name, cursor)`, which reads that page only.
+    Stores that can read one page without reading the rest set `page_reads`.
+    """
+
+    # local stores are fast enough to write to directly from the UI thread
+    local = False
+    sharded = False
+    page_reads = False
+
+    def read_since(self, cursor=None):
+        raise NotImplementedError
+
+    def read_page_since(self, page_name, cursor=None):
+        raise NotImplementedError
+
+    def append_rows(self, rows):
+        raise NotImplementedError
+
+    def tail(self, n, page_name=None):
+        """
+        The last `n` rows, used to check whether an uncertain append landed.
+        Sharded stores return the last rows of `page_name`'s shard.
+        """
+        raise NotImplementedError
+
+    def done_ids(self, page_name):
+        rows, _ = self.read_since(None)
+        return {str(r[1]) for r in rows if r[0] == page_name}
+
+
+# ======================================================
+# GOOGLE SHEETS
+# ======================================================
+def open_spreadsheet(service_account_info, sheet_name):
+    # imported here so only processes that talk to Google pay for them at start-up
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(service_account_info, scopes=SHEETS_SCOPES)
+    gc = gspread.authorize(creds)
+    return gc.open(sheet_name)
+
+
+def open_worksheet(service_account_info, sheet_name):
+    return open_spreadsheet(service_account_info, sheet_name).sheet1
+
+
+class SheetsStore(AnnotationStore):
+    """
+    Rows in a gspread worksheet whose first row is the header.
+
+    The cursor is the data row count plus the last row read. Incremental
+    reads start one row early and check that row is unchanged; if rows were
+    deleted above it (compaction), the sheet is read again from the top.
+    """
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self._header = None
+
+    def read_since(self, cursor=None, prefetched=None):
+        """
+        `prefetched`, if given, holds the values of `pending_range(cursor)`
+        read by the caller (e.g. in one batch with other worksheets).
+        """
+        count, last = cursor if cursor is not None else (0, None)
+        span = self.pending_range(cursor)
+        with timed("sheets.read") as rec:
+            values = None
+            if span is not None:
+                # row count + 1 is the last row already read (the header when count is 0)
+                values = prefetched if prefetched is not None else self.worksheet.get_values(span)
+                if not values or _trim(values[0]) != last:
+                    values = None
+                    count = 0
+            if values is None:
+                values = prefetched if span is None and prefetched is not None else self.worksheet.get_values()
+                if not values:
+                    return [], (0, None)
+                self._header = values[0]
+                if len(values) <= count or _trim(values[count]) != last:
+                    count = 0
+                values = values[count:]
+            rows = values[1:]
+            rec["rows"] = len(rows)
+            rec["full"] = count == 0
+        return [self._normalize(r) for r in rows], (count + len(rows), _trim(values[-1]))
+
+    def pending_range(self, cursor=None):
+        """The A1 range `read_since(cursor)` reads, or None when it reads the whole sheet."""
+        if self._header is None or cursor is None:
+            return None
+        return f"A{cursor[0] + 1}:{_column_letter(len(self._header))}"
+
+    def append_rows(self, rows):
+        with timed("sheets.append", rows=len(rows)):
+            self.worksheet.append_rows(rows, value_input_option="RAW")
+
+    def tail(self, n, page_name=None):
+        total = len(self.worksheet.col_values(1))
+        start = max(2, total - n + 1)
+        width = len(self._header) if self._header else len(ANNOTATION_COLUMNS)
+        return [self._normalize(r) for r in self.worksheet.get_values(f"A{start}:{_column_letter(width)}")]
+
+    def _normalize(self, values):
+        # map by header so a reordered or extended sheet still reads correctly
+        if self._header is None or self._header == ANNOTATION_COLUMNS:
+            return list(values) + [""] * (len(ANNOTATION_COLUMNS) - len(values))
+        record = dict(zip(self._header, values))
+        return [record.get(c, "") for c in ANNOTATION_COLUMNS]
+
+
+# ======================================================
+# SHARDED GOOGLE SHEETS
+# ======================================================
+def shard_title(page_name, prefix=SHARD_PREFIX):
+    # worksheet titles are capped at 100 characters and reject a few symbols
+    return (prefix + re.sub(r"[\[\]*?/\\:']", "_", str(page_name)))[:100]
+
+
+class ShardedSheetsStore(AnnotationStore):
+    """
+    One worksheet per page in the annotation spreadsheet, created the first
+    time a page gets a row. Reading a page touches only its worksheet, so
+    reads no longer grow with the whole history.
+
+    Archived pages keep their (compacted) worksheet under ARCHIVE_PREFIX,
+    hidden; reads still find it. `read_since` reads every shard in one
+    batched request and its cursor holds one position per worksheet.
+    """
+
+    sharded = True
+    page_reads = True
+    LIST_INTERVAL = 30.0      # seconds between worksheet listings when a page has no shard
+    HEADER_ATTEMPTS = 4       # header writes retried on quota and server errors
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self._lock = threading.Lock()
+        self._worksheets = {}     # title -> Worksheet
+        self._listed = None
+        self._stores = {}         # worksheet id -> SheetsStore
+        self._headed = set()      # ids of worksheets whose header row was checked
+
+    # ---------------- shards ----------------
+    def shard(self, page_name, create=False):
+        """
+        The SheetsStore of `page_name`'s worksheet, or None if it has none
+        (and `create` is false). With `create` the shard is ready for appends:
+        its header row is in place.
+        """
+        with self._lock:
+            worksheet = self._find(page_name)
+            if worksheet is None:
+                if not create:
+                    return None
+                worksheet = self._create(page_name)
+            if create:
+                self._ensure_header(worksheet)
+            return self._store_for(worksheet)
+
+    def _find(self, page_name):
+        titles = (shard_title(page_name), shard_title(page_name, ARCHIVE_PREFIX))
+        now = time.monotonic()
+        if (not any(t in self._worksheets for t in titles)
+                and (self._listed is None or now - self._listed > self.LIST_INTERVAL)):
+            self._list()
+        for title in titles:
+            if title in self._worksheets:
+                return self._worksheets[title]
+        return None
+
+    def _list(self):
+        self._worksheets = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+        self._listed = time.monotonic()
+        return self._worksheets
+
+    def _create(self, page_name):
+        import gspread
+
+        title = shard_title(page_name)
+        try:
+            worksheet = self.spreadsheet.add_worksheet(title, rows=1, cols=len(ANNOTATION_COLUMNS))
+        except gspread.exceptions.APIError as e:
+            if "already exists" not in str(e):
+                raise
+            # another replica created it first
+            worksheet = self.spreadsheet.worksheet(title)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def _ensure_header(self, worksheet):
+        # Appending to a sheet without its header would make the first row
+        # the header of every later read. The replica that created the shard
+        # may not have written it yet (or failed to), so check before the
+        # first append and write it if row 1 is empty; writing the same
+        # header twice is harmless.
+        if worksheet.id in self._headed:
+            return
+        import gspread
+
+        for attempt in range(self.HEADER_ATTEMPTS):
+            try:
+                first = worksheet.row_values(1)
+                if not first:
+                    worksheet.update([ANNOTATION_COLUMNS], "A1", value_input_option="RAW")
+                elif not set(ANNOTATION_COLUMNS) <= set(first):
+                    # data above the header: put one back on top
+                    worksheet.insert_row(ANNOTATION_COLUMNS, 1, value_input_option="RAW")
+                break
+            except gspread.exceptions.APIError as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status not in (429, 500, 502, 503, 504) or attempt == self.HEADER_ATTEMPTS - 1:
+                    raise
+                time.sleep(2 ** attempt)
+        self._headed.add(worksheet.id)
+
+    def _store_for(self, worksheet):
+        store = self._stores.get(worksheet.id)
+        if store is None:
+            store = self._stores[worksheet.id] = SheetsStore(worksheet)
+        return store
+
+    # ---------------- store interface ----------------
+    def read_page_since(self, page_name, cursor=None):
+        store = self.shard(page_name)
+        if store is None:
+            return [], cursor
+        return store.read_since(cursor)
+
+    def read_since(self, cursor=None):
+        # every shard in one batchGet, so a full read costs one request
+        # however many pages there are
+        from gspread.utils import absolute_range_name
+
+        cursor = dict(cursor or {})
+        with self._lock:
+            if self._listed is None or time.monotonic() - self._listed > self.LIST_INTERVAL:
+                self._list()
+            shards = [
+                self._store_for(ws) for title, ws in self._worksheets.items()
+                if title.startswith((SHARD_PREFIX, ARCHIVE_PREFIX))
+            ]
+        if not shards:
+            return [], cursor
+        ranges = [
+            absolute_range_name(store.worksheet.title, store.pending_range(cursor.get(str(store.worksheet.id))))
+            for store in shards
+        ]
+        with timed("sheets.batch_read", shards=len(shards)):
+            value_ranges = self.spreadsheet.values_batch_get(ranges).get("valueRanges", [])
+        rows = []
+        for store, value_range in zip(shards, value_ranges):
+            key = str(store.worksheet.id)
+            shard_rows, cursor[key] = store.read_since(cursor.get(key), value_range.get("values", []))
+            rows += shard_rows
+        return rows, cursor
+
+    def append_rows(self, rows):
+        by_page = {}
+        for row in rows:
+            by_page.setdefault(row[0], []).append(row)
+        for page_name, page_rows in by_page.items():
+            self.shard(page_name, create=True).append_rows(page_rows)
+
+    def tail(self, n, page_name=None):
+        if page_name is not None:
+            store = self.shard(page_name)
+            return store.tail(n) if store is not None else []
+        rows, _ = self.read_since(None)
+        return rows[-n:]
+
+    def done_ids(self, page_name):
+        rows, _ = self.read_page_since(page_name)
+        return {str(r[1]) for r in rows if r[0] == page_name}
+
+    # ---------------- maintenance ----------------
+    def compact(self, page_name):
+        """
+        Delete repeated (page_name, post_id, annotator) rows from a page's
+        worksheet, keeping the last one appended. Returns the number deleted.
+        Readers notice the shifted rows through their cursors and re-read.
+        """
+        store = self.shard(page_name)
+        if store is None:
+            return 0
+        rows, _ = store.read_since(None)
+        latest = {}
+        for i, r in enumerate(rows):
+            latest[(r[0], str(r[1]), r[2])] = i
+        keep = set(latest.values())
+        drop = [i for i in range(len(rows)) if i not in keep]
+        if not drop:
+            return 0
+
+        # contiguous runs of data rows, deleted bottom-up in one request;
+        # data row i is sheet row i + 2, i.e. 0-based grid index i + 1
+        runs = []
+        for i in drop:
+            if runs and runs[-1][1] == i:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1])
+        self.spreadsheet.batch_update({"requests": [
+            {"deleteDimension": {"range": {
+                "sheetId": store.worksheet.id, "dimension": "ROWS",
+                "startIndex": start + 1, "endIndex": end + 1,
+            }}}
+            for start, end in reversed(runs)
+        ]})
+        return len(drop)
+
+    def archive(self, page_name):
+        """Compact a closed page and move its worksheet out of the way (renamed and hidden)."""
+        removed = self.compact(page_name)
+        with self._lock:
+            worksheet = self._find(page_name)
+            if worksheet is None or worksheet.title.startswith(ARCHIVE_PREFIX):
+                return removed
+            title = shard_title(page_name, ARCHIVE_PREFIX)
+            self._worksheets.pop(worksheet.title, None)
+            worksheet.update_title(title)
+            worksheet.hide()
+            self._worksheets[title] = worksheet
+        return removed
+
+
+def split_sheet(source, target):
+    """
+    Copy every row of a single-sheet store into the page shards of `target`
+    (a ShardedSheetsStore), skipping rows a shard already has, so the split
+    can be re-run. Returns {page_name: rows copied}.
+    """
+    rows, _ = source.read_since(None)
+    by_page = {}
+    for r in rows:
+        if r[0]:
+            by_page.setdefault(r[0], []).append(r)
+
+    copied = {}
+    for page_name, page_rows in by_page.items():
+        shard = target.shard(page_name, create=True)
+        existing, _ = shard.read_since(None)
+        seen = {_row_key(r) for r in existing}
+        missing = []
+        for r in page_rows:
+            key = _row_key(r)
+            if key not in seen:
+                seen.add(key)
+                missing.append(r)
+        for i in range(0, len(missing), 500):
+            shard.append_rows(missing[i:i + 500])
+        copied[page_name] = len(missing)
+    return copied
+
+
+# ======================================================
+# SQLITE
+# ======================================================
+class SQLiteStore(AnnotationStore):
+    """
+    Rows in a local SQLite database (WAL mode). The cursor is the last rowid
+    read. Reads of a single page use the (page_name, post_id) index.
+    """
+
+    local = True
+    page_reads = True
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in ANNOTATION_COLUMNS)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS annotations (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_page_post ON annotations (page_name, post_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_annotator_time ON annotations (annotator, timestamp)")
+
+    def read_since(self, cursor=None):
+        with timed("sqlite.read"), self._lock:
+            cur = self._conn.execute(
+                f"SELECT id, {', '.join(ANNOTATION_COLUMNS)} FROM annotations WHERE id > ? ORDER BY id",
+                (cursor or 0,),
+            )
+            rows = cur.fetchall()
+        if not rows:
+            return [], cursor or 0
+        return [list(r[1:]) for r in rows], rows[-1][0]
+
+    def read_page_since(self, page_name, cursor=None):
+        with timed("sqlite.read", page=page_name), self._lock:
+            cur = self._conn.execute(
+                f"SELECT id, {', '.join(ANNOTATION_COLUMNS)} FROM annotations "
+                f"WHERE page_name = ? AND id > ? ORDER BY id",
+                (page_name, cursor or 0),
+            )
+            rows = cur.fetchall()
+        if not rows:
+            return [], cursor or 0
+        return [list(r[1:]) for r in rows], rows[-1][0]
+
+    def page_names(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT page_name FROM annotations WHERE page_name != '' ORDER BY page_name"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def append_rows(self, rows):
+        width = len(ANNOTATION_COLUMNS)
+        values = [[str(v) for v in (list(r) + [""] * (width - len(r)))[:width]] for r in rows]
+        with timed("sqlite.append", rows=len(rows)), self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT INTO annotations ({', '.join(ANNOTATION_COLUMNS)}) VALUES ({', '.join('?' * width)})",
+                values,
+            )
+            self._conn.execute("COMMIT")
+
+    def tail(self, n, page_name=None):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(ANNOTATION_COLUMNS)} FROM annotations ORDER BY id DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [list(r) for r in reversed(rows)]
+
+    def done_ids(self, page_name):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT post_id FROM annotations WHERE page_name = ?", (page_name,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+
+# ======================================================
+# SHARED READS
+# ======================================================
+class SharedReadStore(AnnotationStore):
+    """
+    A remote store whose reads are shared between app replicas through a
+    `SharedCache`.
+
+    The rows after a cursor are cached under that cursor for `ttl` seconds,
+    so replicas polling from the same position cost one store read between
+    them instead of one each. Writes go straight to the wrapped store.
+    """
+
+    def __init__(self, store, shared, name, ttl=5.0):
+        self.store = store
+        self.shared = shared
+        self.name = name
+        self.ttl = ttl
+        self.local = store.local
+        self.sharded = store.sharded
+        self.page_reads = store.page_reads
+
+    def read_since(self, cursor=None):
+        return self._shared_read(None, cursor, lambda: self.store.read_since(cursor))
+
+    def read_page_since(self, page_name, cursor=None):
+        return self._shared_read(page_name, cursor, lambda: self.store.read_page_since(page_name, cursor))
+
+    def _shared_read(self, page_name, cursor, read):
+        position = hashlib.sha1(json.dumps(cursor).encode()).hexdigest()[:16]
+        key = f"annotations:{self.name}:{page_name or '*'}:{position}"
+        data = self.shared.get_or_fetch(
+            key, lambda: json.dumps(read(), separators=(",", ":")).encode(), ttl=self.ttl
+        )
+        rows, new_cursor = json.loads(data)
+        return rows, new_cursor
+
+    def append_rows(self, rows):
+        self.store.append_rows(rows)
+
+    def tail(self, n, page_name=None):
+        return self.store.tail(n, page_name)
+
+
+# ======================================================
+# SYNC
+# ======================================================
+def sync_stores(source, target):
+    """
+    Append to `target` every row of `source` it does not already have, matched
+    on (page_name, post_id, annotator, timestamp). Returns the number copied.
+    """
+    existing, _ = target.read_since(None)
+    seen = {_row_key(r) for r in existing}
+    rows, _ = source.read_since(None)
+    missing = []
+    for r in rows:
+        key = _row_key(r)
+        if key not in seen:
+            seen.add(key)
+            missing.append(r)
+    for i in range(0, len(missing), 500):
+        target.append_rows(missing[i:i + 500])
+    return len(missing)
+
+
+def _row_key(row):
+    # page_name, post_id, annotator, timestamp identify a submission
+    row = [str(v) for v in row] + [""] * (len(ANNOTATION_COLUMNS) - len(row))
+    return row[0], row[1], row[2], row[len(ANNOTATION_COLUMNS) - 1]
+
+
+def _trim(values):
+    # the API drops trailing empty cells, so compare rows without them
+    values = [str(v) for v in values]
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+
+def _column_letter(n):
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
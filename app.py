@@ -1,18 +1,114 @@
+import time
+# measured from here, so the first run can report what its imports cost
+_imports_started = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import gspread
-from google.oauth2.service_account import Credentials
-import requests
-from PIL import Image
-import io
+import importlib
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from annotation_store import (
+    SheetsStore, ShardedSheetsStore, SQLiteStore, SharedReadStore, open_spreadsheet, open_worksheet,
+)
+from annotation_index import AnnotationIndex
+from work_scheduler import WorkScheduler, overlap_required
+from submission_queue import SubmissionQueue
+from image_prefetch import ImagePrefetcher
+from image_cache import ImageCache, render_variant, variant_spec
+from page_loader import PagePosts
+from github_client import GitHubClient
+from page_mirror import PageMirror
+from shared_cache import open_shared_cache
+from startup import Startup
+import perf
+from perf import timed
+
+log = logging.getLogger(__name__)
 
 # ---------------- CONFIG ----------------
 SHEET_NAME = "annotation_db"
 
+# "sheets" (Google Sheets, shared), "sheets-sharded" (one worksheet per page in
+# the same spreadsheet; run `python migrate_store.py split-sheet` before
+# switching) or "sqlite" (local database at SQLITE_PATH); migrate_store.py
+# copies annotations between them
+ANNOTATION_BACKEND = "sheets"
+SQLITE_PATH = "annotations.db"
+
 GITHUB_OWNER = "sajalkuikel"
 GITHUB_REPO = "nepali_memes"
 GITHUB_BRANCH = "main"
+# overridable so benchmarks can point the app at a local stand-in
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+
+# cache shared by all replicas behind a load balancer, so GitHub and the sheet
+# are read once rather than once per replica: "" (off), a directory every
+# replica mounts (or file:///path), or redis://host:6379/0 (rediss:// for TLS)
+SHARED_CACHE_URL = os.environ.get("SHARED_CACHE_URL", "")
+# shared copies of GitHub files expire after this long, so old pages age out
+SHARED_BLOB_TTL_SECONDS = 7 * 24 * 3600
+
+# whole pages can be synced here for offline annotation
+MIRROR_DIR = ".mirror"
+
+# how long a GitHub file is served from cache before it is revalidated (a 304 when unchanged)
+GITHUB_REVALIDATE_SECONDS = 300
+
+# how many upcoming posts to download images for while the current one is labelled
+PREFETCH_AHEAD = 5
+
+# each session leases its own batch of posts; abandoned leases expire
+LEASE_SECONDS = 15 * 60
+# a stable OVERLAP_RATE fraction of posts is labelled by OVERLAP_FACTOR annotators
+# (for inter-annotator agreement); 1 disables overlap
+OVERLAP_FACTOR = 1
+OVERLAP_RATE = 0.0
+
+# decoded images kept in memory / encoded originals kept on disk
+IMAGE_CACHE_DIR = ".image_cache"
+IMAGE_MEMORY_CACHE_MB = 64
+IMAGE_DISK_CACHE_MB = 1024
+
+# the meme column is ~40% of a wide layout; originals are only sent on request
+DISPLAY_MAX_WIDTH = 800
+DISPLAY_FORMAT = "WEBP"
+DISPLAY_QUALITY = 80
+
+# triage mode: a grid of thumbnails for marking many non-memes at once
+TRIAGE_BATCH = 30
+TRIAGE_COLUMNS = 5
+THUMBNAIL_MAX_WIDTH = 240
+
+# perceptual hashes of every image seen, for finding reposted memes; two images
+# are near-duplicates when both 64-bit hashes differ in at most DUPLICATE_RADIUS bits
+FINGERPRINT_DB = ".image_cache/fingerprints.db"
+DUPLICATE_RADIUS = 6
+# the form waits at most this long for a post's repost search; a slower one
+# shows its reposts on the form's next rerun instead of holding the form back
+DUPLICATE_WAIT_SECONDS = 0.2
+
+# admin overview of every page: post files counted at most this many at a time,
+# and the view refreshed (incrementally) this often
+DASHBOARD_CONCURRENCY = 8
+DASHBOARD_REFRESH_SECONDS = 60
+
+# cold start: the first run of a process warms the sheet, folder list and the
+# last page anyone opened in the background while the login page is up, and
+# appends a start-up time breakdown to STARTUP_LOG_PATH
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "1") != "0"
+STARTUP_LOG_PATH = "startup_log.jsonl"
+LAST_PAGE_PATH = ".last_page"
+# libraries only the annotation view needs, imported during the warm-up
+WARMUP_MODULES = ["pandas", "pyarrow", "gspread", "google.oauth2.service_account", "PIL.Image", "numpy"]
+
+# per-rerun timings: JSON lines for offline analysis, Prometheus text file for scraping
+PERF_LOG_PATH = "perf_log.jsonl"
+# the log is rotated to perf_log.jsonl.1 at this size
+PERF_LOG_MAX_MB = 50
+PERF_PROM_PATH = "perf_metrics.prom"
 
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(page_title="Nepali Meme Annotation", layout="wide")
@@ -35,143 +131,520 @@ st.markdown(
 )
 
 # ======================================================
-# 🔐 AUTHENTICATION
+# ANNOTATION STORE
 # ======================================================
-def login():
-    st.title("🔐 Login")
+@st.cache_resource
+def get_shared_cache():
+    return open_shared_cache(SHARED_CACHE_URL)
 
-    username = st.text_input("Username")
-    password = st.text_input("Password", type="password")
 
-    if st.button("Login"):
-        users = st.secrets["auth_users"]
+@st.cache_resource
+def get_annotation_store():
+    if ANNOTATION_BACKEND == "sqlite":
+        return SQLiteStore(SQLITE_PATH)
+    if ANNOTATION_BACKEND == "sheets-sharded":
+        store = ShardedSheetsStore(open_spreadsheet(st.secrets["gcp_service_account"], SHEET_NAME))
+    else:
+        store = SheetsStore(open_worksheet(st.secrets["gcp_service_account"], SHEET_NAME))
+    shared = get_shared_cache()
+    # replicas poll the sheet from the same cursors, so they can share each read
+    return store if shared is None else SharedReadStore(store, shared, SHEET_NAME)
 
-        if username in users and password == users[username]:
-            st.session_state["authenticated"] = True
-            st.session_state["username"] = username
-            st.rerun()
-        else:
-            st.error("❌ Invalid username or password")
 
+@st.cache_resource
+def get_submission_queue():
+    # remote stores get a write-behind journal; local ones are written directly
+    store = get_annotation_store()
+    return None if store.local else SubmissionQueue(store).start()
 
-if "authenticated" not in st.session_state:
-    st.session_state["authenticated"] = False
 
-if not st.session_state["authenticated"]:
-    login()
-    st.stop()
+@st.cache_resource
+def get_annotation_index():
+    index = AnnotationIndex(get_annotation_store(), required_labels=overlap_required(OVERLAP_FACTOR, OVERLAP_RATE))
+    # rows still waiting in the journal are done as far as the UI is concerned
+    queue = get_submission_queue()
+    for pending in (queue.pending_rows() if queue else []):
+        index.mark_done(pending[0], pending[1], pending[2])
+    return index
+
+
+def save_annotation(row):
+    save_annotations([row])
+
+
+def save_annotations(rows):
+    # one append (or one journal transaction) however many rows
+    if not rows:
+        return
+    with timed("annotation.save", backend=ANNOTATION_BACKEND, rows=len(rows)):
+        if submission_queue is None:
+            annotation_store.append_rows(rows)
+        else:
+            submission_queue.submit_many(rows)
+
+
+@st.cache_resource
+def get_work_scheduler():
+    # the current post plus PREFETCH_AHEAD upcoming ones are leased together
+    return WorkScheduler(get_annotation_index(), lease_seconds=LEASE_SECONDS, batch_size=PREFETCH_AHEAD + 1)
 
-annotator = st.session_state["username"]
 
 # ======================================================
-# GOOGLE SHEETS
+# GITHUB HELPERS
 # ======================================================
 @st.cache_resource
-def get_sheet():
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    creds = Credentials.from_service_account_info(
-        st.secrets["gcp_service_account"],
-        scopes=scopes
+def get_github_client(owner, repo):
+    return GitHubClient(
+        owner, repo, GITHUB_BRANCH, st.secrets["GITHUB_TOKEN"],
+        api_url=GITHUB_API_URL, revalidate_after=GITHUB_REVALIDATE_SECONDS,
+        shared=get_shared_cache(), blob_ttl=SHARED_BLOB_TTL_SECONDS,
     )
-    gc = gspread.authorize(creds)
-    return gc.open(SHEET_NAME).sheet1
 
 
-sheet = get_sheet()
+@st.cache_resource
+def get_page_mirror(owner, repo):
+    return PageMirror(get_github_client(owner, repo), root=MIRROR_DIR)
+
+
+@st.cache_resource
+def get_manifest_fallback(owner, repo):
+    # {"manifest", "until"}: the mirror snapshot in use while GitHub is unreachable
+    return {}
+
+
+def github_manifest(owner, repo):
+    # one recursive Git Trees call knows every page, file and blob SHA;
+    # without GitHub, fall back to the snapshot saved by the last page sync and
+    # keep using it until the next revalidation is due, rather than paying for
+    # a failed request and a snapshot read on every call
+    fallback = get_manifest_fallback(owner, repo)
+    if fallback and time.monotonic() < fallback["until"]:
+        return fallback["manifest"]
+    try:
+        manifest = get_github_client(owner, repo).manifest()
+    except OSError:
+        snapshot = get_page_mirror(owner, repo).manifest()
+        if snapshot is None:
+            raise
+        fallback.update(manifest=snapshot, until=time.monotonic() + GITHUB_REVALIDATE_SECONDS)
+        return snapshot
+    fallback.clear()
+    return manifest
+
 
-# ======================================================
-# GITHUB HELPERS
-# ======================================================
-@st.cache_data(show_spinner=False)
 def github_list_folders(owner, repo, path=""):
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={GITHUB_BRANCH}"
-    headers = {
-        "Authorization": f"Bearer {st.secrets['GITHUB_TOKEN']}",
-        "Accept": "application/vnd.github+json"
-    }
-    r = requests.get(url, headers=headers)
-    r.raise_for_status()
-    return [i["name"] for i in r.json() if i["type"] == "dir"]
+    manifest = github_manifest(owner, repo)
+    if manifest.truncated:
+        # a truncated tree can leave out whole folders; list this level on its own
+        try:
+            return get_github_client(owner, repo).folders(path)
+        except OSError:
+            pass
+    return manifest.dirs(path)
+
+
+@st.cache_resource(show_spinner=False)
+def load_mirrored_page(owner, repo, path, sha):
+    # keyed by blob SHA so a re-synced file gets a fresh PagePosts
+    return PagePosts().load_in_background(get_page_mirror(owner, repo).iter_lines(path))
 
 
-@st.cache_data(show_spinner=False)
 def load_page_jsonl(owner, repo, page_name):
+    posts = _load_page_jsonl(owner, repo, page_name)
+    if posts.failed:
+        # a download cut off halfway must not be served from cache again
+        path = f"{page_name}/facebook_posts.jsonl"
+        load_mirrored_page.clear(owner, repo, path, github_manifest(owner, repo).blob_sha(path))
+        get_github_client(owner, repo).forget(path)
+        posts = _load_page_jsonl(owner, repo, page_name)
+    return posts
+
+
+def _load_page_jsonl(owner, repo, page_name):
+    # parsed on a background thread so the first posts are usable right away;
+    # a new blob SHA in the manifest replaces the PagePosts
     path = f"{page_name}/facebook_posts.jsonl"
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={GITHUB_BRANCH}"
-    headers = {
-        "Authorization": f"Bearer {st.secrets['GITHUB_TOKEN']}",
-        "Accept": "application/vnd.github.raw"
-    }
-    r = requests.get(url, headers=headers)
-    r.raise_for_status()
+    sha = github_manifest(owner, repo).blob_sha(path)
+    if get_page_mirror(owner, repo).has(path, sha):
+        return load_mirrored_page(owner, repo, path, sha)
+    client = get_github_client(owner, repo)
+    if client.shared is not None and sha is not None:
+        # fetched once for all replicas, then parsed locally
+        return client.cached_blob(path, sha, lambda data: PagePosts().load_in_background(data.splitlines()))
+    return client.cached(
+        path,
+        lambda r: PagePosts().load_in_background(r.iter_lines()),
+        stream=True,
+        sha=sha,
+    )
 
-    df = pd.read_json(io.BytesIO(r.content), lines=True)
-    df["post_id"] = df["post_id"].astype(str)
-    return df
+
+@st.cache_resource
+def get_image_cache():
+    return ImageCache(
+        IMAGE_CACHE_DIR,
+        memory_bytes=IMAGE_MEMORY_CACHE_MB * 1024 ** 2,
+        disk_bytes=IMAGE_DISK_CACHE_MB * 1024 ** 2,
+    )
+
+
+def sync_github_image(owner, repo, path):
+    """Make sure the image cache holds the current version of `path`; returns its blob SHA."""
+    cache = get_image_cache()
+    client = get_github_client(owner, repo)
+    manifest = github_manifest(owner, repo)
+    key = f"{owner}/{repo}/{path}"
+
+    if manifest.exists(path) is False:
+        raise FileNotFoundError(path)
+
+    sha = cache.sha_for(key)
+    expected = manifest.blob_sha(path)
+    if expected is not None:
+        # the manifest is authoritative: a matching SHA needs no request at all
+        if sha == expected:
+            return sha
+        mirror = get_page_mirror(owner, repo)
+        if mirror.has(path, expected):
+            return cache.store(key, mirror.read_bytes(path))
+        return cache.store(key, client.blob(path, expected))
+
+    # truncated manifest: fall back to ETag revalidation
+    if sha is not None and client.is_fresh(path):
+        return sha
+    r = client.get(path, conditional=sha is not None)
+    if r.status_code == 304:
+        return sha
+    return cache.store(key, r.content)
 
 
-@st.cache_data(show_spinner=False)
 def load_private_github_image(owner, repo, path):
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={GITHUB_BRANCH}"
-    headers = {
-        "Authorization": f"Bearer {st.secrets['GITHUB_TOKEN']}",
-        "Accept": "application/vnd.github.raw"
-    }
-    r = requests.get(url, headers=headers)
-    r.raise_for_status()
-    return Image.open(io.BytesIO(r.content))
+    sync_github_image(owner, repo, path)
+    return get_image_cache().get(f"{owner}/{repo}/{path}")
+
+
+def load_display_image(owner, repo, path):
+    return load_image_variant(owner, repo, path, DISPLAY_MAX_WIDTH)
+
+
+def load_image_variant(owner, repo, path, max_width):
+    cache = get_image_cache()
+    sha = sync_github_image(owner, repo, path)
+    # variants are keyed by the original's SHA, so a changed image gets a new one
+    key = f"{sha}@{variant_spec(max_width, DISPLAY_FORMAT, DISPLAY_QUALITY)}"
+    data = cache.get_bytes(key)
+    if data is not None:
+        return data
+
+    img = load_private_github_image(owner, repo, path)
+    with timed("image.render", path=path) as rec:
+        data = render_variant(img, max_width, DISPLAY_FORMAT, DISPLAY_QUALITY)
+        rec["bytes"] = len(data)
+    return cache.put_bytes(key, data)
 
-# ======================================================
-# LAYOUT
-# ======================================================
-col_meme, col_ui = st.columns([4, 6])
 
 # ======================================================
-# RIGHT UI
+# NEAR-DUPLICATES
 # ======================================================
-with col_ui:
-    # same row: logout + dataset
-    c1, c2 = st.columns([1,4])
+@st.cache_resource
+def get_fingerprint_index():
+    from image_hash import FingerprintIndex
 
-    with c1:
-        st.markdown("👤 Logged in as: **" + annotator + "**")
-        if st.button("🚪 Logout"):
-            st.session_state.clear()
-            st.rerun()
+    return FingerprintIndex(FINGERPRINT_DB, radius=DUPLICATE_RADIUS)
 
-    with c2:
-        pages = github_list_folders(GITHUB_OWNER, GITHUB_REPO)
-        page_name = st.selectbox("Select Page / Dataset", pages, key="page_select")
 
-    data = load_page_jsonl(GITHUB_OWNER, GITHUB_REPO, page_name)
+def fingerprint_image(owner, repo, path):
+    # keyed by blob SHA, so an image is hashed once however often it is reposted
+    index = get_fingerprint_index()
+    sha = sync_github_image(owner, repo, path)
+    if not index.has(sha):
+        index.add(sha, load_private_github_image(owner, repo, path))
+    return sha
 
-    records = sheet.get_all_records()
-    ann_df = pd.DataFrame(records) if records else pd.DataFrame(
-        columns=["page_name", "post_id", "annotator", "meme", "sentiment", "intent", "cyberbullying", "target", "protected_group", "harm", "harmfulness", "emotion", "modality", "timestamp"]
-    )
 
-    ann_df["post_id"] = ann_df["post_id"].astype(str)
+def prefetch_image(owner, repo, path, max_width=DISPLAY_MAX_WIDTH):
+    load_image_variant(owner, repo, path, max_width)
+    fingerprint_image(owner, repo, path)
+
 
-    done_ids = ann_df[
-        ann_df["page_name"] == page_name
-    ]["post_id"].tolist()
+@st.cache_resource
+def get_fingerprint_worker():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="fingerprint")
 
-    remaining = data[~data["post_id"].isin(done_ids)]
 
-    if remaining.empty:
-        st.success(f"🎉 All annotations completed for **{page_name}**")
-        st.stop()
+def fingerprint_page(owner, repo, page_name):
+    """Hash every image of a page, so its reposts elsewhere can be found before anyone opens them."""
+    manifest = github_manifest(owner, repo)
+    posts = load_page_jsonl(owner, repo, page_name)
+    for image_file in posts.frame()["image_file"].dropna().unique():
+        path = f"{page_name}/{image_file}"
+        if manifest.exists(path) is False:
+            continue
+        try:
+            fingerprint_image(owner, repo, path)
+        except OSError:
+            pass
 
-    row = remaining.iloc[0]
 
-    # st.markdown("---")
+def find_duplicates(page_name, row, annotator):
+    """
+    (page, post_id, image path) of other posts, on any page, showing the same
+    image as `row` or a near-duplicate of it, that `annotator` has not labelled yet.
+    """
+    owner, repo, path = row["image_key"]
+    manifest = github_manifest(owner, repo)
+    with timed("duplicates.find") as rec:
+        try:
+            sha = fingerprint_image(owner, repo, path)
+        except OSError:
+            return []
+        shas = [sha] + get_fingerprint_index().near(sha)
+
+        duplicates = []
+        for dup_path in dict.fromkeys(p for s in shas for p in manifest.paths_with_sha(s)):
+            dup_page, _, image_file = dup_path.partition("/")
+            if dup_path == path or not image_file:
+                continue
+            try:
+                dup_posts = load_page_jsonl(owner, repo, dup_page)
+                post_ids = dup_posts.posts_with_image(image_file)
+            except OSError:
+                continue
+            # a sharded index only knows the pages it has read; read this one too
+            annotation_index.refresh(page_name=dup_page)
+            duplicates += [
+                (dup_page, post_id, dup_path) for post_id in post_ids
+                if not annotation_index.is_unavailable(dup_page, post_id, annotator)
+            ]
+        rec["found"] = len(duplicates)
+    return duplicates
+
+
+@st.cache_resource
+def get_duplicate_finder():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="duplicates")
+
+
+def attach_duplicates(page_name, row, annotator):
+    # runs on the duplicate finder, so the form only reads row["duplicates"]
+    try:
+        duplicates = find_duplicates(page_name, row, annotator)
+    except Exception as e:
+        log.warning("repost search failed for %s/%s: %r", page_name, row["post_id"], e)
+        duplicates = []
+    owner, repo, _ = row["image_key"]
+    for _, _, dup_path in duplicates:
+        try:
+            load_image_variant(owner, repo, dup_path, THUMBNAIL_MAX_WIDTH)
+        except OSError:
+            pass
+    row["duplicates"] = duplicates
+
+
+@st.cache_resource
+def get_image_prefetcher():
+    # upcoming images are also fingerprinted, so repost lookups rarely decode on the script thread
+    return ImagePrefetcher(prefetch_image)
+
+
+@st.cache_resource
+def get_thumbnail_loader():
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="thumbnail")
+
+
+def load_thumbnail(image_key):
+    # None only when the post has no image; failed downloads or decodes raise
+    key = (*image_key, THUMBNAIL_MAX_WIDTH)
+    image_prefetcher.wait(key)
+    try:
+        return load_image_variant(*key)
+    except FileNotFoundError:
+        return None
+
+# ======================================================
+# POST QUEUE
+# ======================================================
+# the leased batch lives in session state as ready-to-render rows, so the
+# fragments below can move on to the next post without a full rerun
+def assign_posts(page_name, posts, triage=False):
+    # triage leases a whole grid of posts instead of the usual small batch
+    size = TRIAGE_BATCH if triage else work_scheduler.batch_size
+
+    with timed("index.refresh") as rec:
+        rec["cache"] = "miss" if annotation_index.refresh(page_name=page_name) else "hit"
+
+    # skip posts that are finished, that this annotator already labelled, or
+    # that other sessions hold a lease on; then lease our own batch
+    with timed("posts.filter"):
+        excluded = annotation_index.unavailable_for(page_name, annotator)
+        busy = work_scheduler.busy(page_name, session_id)
+        # posts queued in other batches stay candidates (they can be taken
+        # over when nothing is free) but must not crowd out the free ones
+        queued_elsewhere = work_scheduler.busy(page_name, session_id, firm_only=False) - busy - excluded
+        candidates = posts.upcoming(excluded | busy, 2 * size + len(queued_elsewhere))
+    with timed("scheduler.claim"):
+        batch = work_scheduler.claim(page_name, session_id, annotator, [p["post_id"] for p in candidates], size=size)
+    # a lease can outlive its post if the page file changed on GitHub
+    batch = [post_id for post_id in batch if posts.offset(post_id) is not None]
+
+    # rows already queued keep what was computed for them (e.g. their duplicates)
+    queue = st.session_state.get("post_queue")
+    previous = {r["post_id"]: r for r in queue["rows"]} if queue and queue["page"] == page_name else {}
+    rows = [previous.get(post_id) or posts.row(post_id) for post_id in batch]
+    for post in rows:
+        post["image_key"] = (GITHUB_OWNER, GITHUB_REPO, f"{page_name}/{post['image_file']}")
+
+    # download the current and next few images in the background; switching
+    # pages replaces the key list, which cancels work queued for the old page
+    manifest = github_manifest(GITHUB_OWNER, GITHUB_REPO)
+    image_prefetcher.schedule(session_id, [
+        (*post["image_key"], THUMBNAIL_MAX_WIDTH) if triage else post["image_key"]
+        for post in rows if manifest.exists(post["image_key"][2]) is not False
+    ])
+
+    # look for reposts of every queued meme off the script thread; rows keep
+    # the result, so each post is searched once per batch it is in
+    jobs = st.session_state.get("duplicate_jobs", {})
+    if not triage:
+        jobs = {
+            (page_name, post["post_id"]): jobs.get((page_name, post["post_id"]))
+            or get_duplicate_finder().submit(attach_duplicates, page_name, post, annotator)
+            for post in rows if "duplicates" not in post
+        }
+    st.session_state["duplicate_jobs"] = jobs
+
+    st.session_state["post_queue"] = {
+        "page": page_name,
+        "posts": posts,
+        "rows": rows,
+        "blocked": bool(busy - excluded),
+        "triage": triage,
+    }
+    return rows
+
+
+def submit_annotation(page_name, post_id):
+    begin_timings()
+
+    def value(field):
+        return st.session_state.get(f"{field}_{post_id}")
+
+    meme_label = value("meme_label")
+    sentiment = value("sentiment")
+    intent = value("intent")
+    cyberbullying = value("cyberbullying")
+    target = value("target")
+    protected_group = value("protected_group")
+    harm = value("harm")
+    harmfulness = value("harmfulness")
+    emotion = value("emotion")
+    modality = value("modality")
+
+    # ==============================
+    # VALIDATION ONLY IF MEME = YES
+    # ==============================
+    # returning here reruns just the form, which then shows the error
+    if meme_label == "Yes":
+
+        required_fields = {
+            "Sentiment": sentiment,
+            "Intent": intent,
+            "Cyberbullying": cyberbullying,
+            "Target": target,
+            "Harm Type": harm,
+            "Emotion": emotion,
+            "Modality": modality
+        }
+
+        missing = [k for k, v in required_fields.items() if v is None]
+
+        if missing:
+            st.session_state["form_error"] = f"⚠️ Please label: {', '.join(missing)}"
+            return
+        if harm != "No Harm" and harmfulness is None:
+            st.session_state["form_error"] = "⚠️ Please provide a Harmfulness score for harmful content."
+            return
+
+    # the same labels go to the reposts of this image the annotator kept ticked
+    targets = [(page_name, post_id)]
+    if value("propagate"):
+        targets += [
+            (dup_page, dup_post) for i, (dup_page, dup_post, _) in enumerate(current_post().get("duplicates") or [])
+            if value(f"propagate_{i}") is not False
+        ]
+
+    # SAVE THE DATA (remote stores: journalled locally, flushed in the background)
+    save_annotations([
+        [
+            target_page,
+            target_post,
+            annotator,
+            meme_label,
+            sentiment if sentiment else "",
+            intent if intent else "",
+            cyberbullying if cyberbullying else "",
+            target if target else "",
+            protected_group if protected_group else "",
+            harm if harm else "",
+            harmfulness if harmfulness else "",
+            emotion if emotion else "",
+            modality if modality else "",
+
+            datetime.now().isoformat()
+        ]
+        for target_page, target_post in targets
+    ])
+    for target_page, target_post in targets:
+        annotation_index.mark_done(target_page, target_post, annotator)
+        work_scheduler.release(session_id, target_page, target_post)
+
+    # only the post-dependent panels change; the header, page list and
+    # sidebar stay as rendered unless the page has run out of posts
+    if assign_posts(page_name, st.session_state["post_queue"]["posts"]):
+        st.rerun(["meme_panel", "label_form", "progress_panel"])
+    st.rerun()
+
+
+def submit_triage(page_name, post_ids, unseen):
+    begin_timings()
+    # posts shown without a thumbnail were never judged here; they go to the full form too
+    memes = [
+        post_id for post_id in post_ids
+        if post_id in unseen or st.session_state.get(f"triage_meme_{post_id}")
+    ]
+    not_memes = [post_id for post_id in post_ids if post_id not in memes]
+
+    # everything left unticked is "not a meme", written in a single append
+    now = datetime.now().isoformat()
+    save_annotations([
+        [page_name, post_id, annotator, "No", "", "", "", "", "", "", "", "", "", now]
+        for post_id in not_memes
+    ])
+    for post_id in not_memes:
+        annotation_index.mark_done(page_name, post_id, annotator)
+        work_scheduler.release(session_id, page_name, post_id)
+
+    if memes:
+        # the ticked posts stay leased and head the batch, so the detailed form takes them next
+        st.session_state["triage_mode"] = False
+        st.rerun()
+    if assign_posts(page_name, st.session_state["post_queue"]["posts"], triage=True):
+        st.rerun(["triage_grid", "progress_panel"])
+    st.rerun()
+
+
+def current_post():
+    return st.session_state["post_queue"]["rows"][0]
+
+
+# ======================================================
+# LABEL FORM
+# ======================================================
+@st.fragment(key="label_form")
+def label_form():
+    queue = st.session_state["post_queue"]
+    row = current_post()
 
-    # ======================================================
-    # LABEL FORM — fully inside col_ui (RIGHT SIDE)
-    # ======================================================
     with st.form("annotation_form"):
 
         meme_label = st.radio(
@@ -181,23 +654,12 @@ with col_ui:
             key=f"meme_label_{row['post_id']}"
         )
 
-        sentiment = None
-        intent = None
-        cyberbullying = None
-        target = None
-        protected_group = None
-        harm = None
-        harmfulness = None
-        emotion = None
-        modality = None
-
-
         if meme_label == "Yes":  
             st.markdown("### 📌 Meme Attributes")
             col1, col2, col3, col4 = st.columns(4)
 
             with col1:
-                modality = st.radio(
+                st.radio(
                     "Modality.\n (Select how the meme conveys meaning) ",
                     [
                         "Image",
@@ -220,7 +682,7 @@ with col_ui:
                         """
 
                 )
-                intent = st.radio(
+                st.radio(
                     "Intent of Meme",
                     ["Benign / Playful - (हानिरहित / रमाइलो उद्देश्य)", "Mocking/Sarcasm (उडाउने / व्यंग्यात्मक)", "Critical / Satirical (आलोचनात्मक/ व्यंग्यसहितको)", "Malicious (हानि पुर्‍याउने नियत)", "Deceptive (भ्रामक / गलत धारणा फैलाउने)"],
                     index=None,
@@ -259,7 +721,7 @@ with col_ui:
                 )
 
             with col2:
-                 cyberbullying = st.radio(
+                 st.radio(
                     "Presence of Hate / Cyber Bullying",
                     ["Yes", "No"],
                     index=None,
@@ -282,7 +744,7 @@ with col_ui:
                         """
                 )
                  
-                 target = st.radio(
+                 st.radio(
                     "Target of the meme",
                     ["Individual", "Organization", 'Community', "None"],
                     index=None,
@@ -313,7 +775,7 @@ with col_ui:
                         """
                 )
                  
-                 protected_group = st.radio(
+                 st.radio(
                     "Is target a protected group?",
                     ["Yes", "No"],
                     index=None,
@@ -336,7 +798,7 @@ with col_ui:
                     *Eg. Dalits, Madhesis, Muslims, LGBTQ+, disabled, etc.*
                     """)
             with col3:
-                harm = st.radio(
+                st.radio(
                     "How does this meme harm the target?",
                     ["Psychological/Emotional (मानसिक / भावनात्मक)", "Social/Reputational (सामाजिक / प्रतिष्ठासम्बन्धी)", "Financial or Material (आर्थिक वा भौतिक हानि)",  "No Harm"],
                     index=None,
@@ -368,9 +830,8 @@ with col_ui:
 
                 )
                 
-                harmfulness = ""
                 st.write('')
-                harmfulness = st.radio(
+                st.radio(
                     "If 'Harmful' , please label Harmfulness Score",
                     ["(1) Offensive", "(2) Partially harmful", "(3) Very harmful" ],
                     index=None,
@@ -397,7 +858,7 @@ with col_ui:
                 )
 
             with col4:
-                emotion = st.radio(
+                st.radio(
                     "Emotion",
                     [
                         "Joy (खुशी)",
@@ -452,7 +913,7 @@ with col_ui:
 
                 )
                 
-                sentiment = st.radio(
+                st.radio(
                     "Sentiment",
                     ["Positive", "Negative", "Neutral"],
                     index=None,
@@ -472,69 +933,168 @@ with col_ui:
                 )
                 
 
-        submitted = st.form_submit_button("➡️ Submit & Next")
-
-        if submitted:
-            # ==============================
-            # VALIDATION ONLY IF MEME = YES
-            # ==============================
-            if meme_label == "Yes":
-
-                required_fields = {
-                    "Sentiment": sentiment,
-                    "Intent": intent,
-                    "Cyberbullying": cyberbullying,
-                    "Target": target,
-                    "Harm Type": harm,
-                    "Emotion": emotion,
-                    "Modality": modality
-                }
-
-                missing = [k for k, v in required_fields.items() if v is None]
-
-                if missing:
-                    st.error(f"⚠️ Please label: {', '.join(missing)}")
-                elif harm != "No Harm" and harmfulness is None:
-                    st.error("⚠️ Please provide a Harmfulness score for harmful content.")
-                else:
-                    save_and_next = True
-            else:
-                # Meme = No → always valid
-                save_and_next = True
-
-
-            if submitted and 'save_and_next' in locals() and save_and_next:
-
-                # SAVE THE DATA
-                sheet.append_row([
-                    page_name,
-                    row["post_id"],
-                    annotator,
-                    meme_label,
-                    sentiment if sentiment else "",
-                    intent if intent else "",
-                    cyberbullying if cyberbullying else "",
-                    target if target else "",
-                    protected_group if protected_group else "",
-                    harm if harm else "",
-                    harmfulness if harmfulness else "",
-                    emotion if emotion else "",
-                    modality if modality else "",
-
-                    datetime.now().isoformat()
-                ])
-
-                st.rerun()
-
-    progress = len(done_ids) / len(data)
+        # reposts of this meme (same or near-identical image) can take the same
+        # labels; each one is shown so a false match can be unticked first
+        job = st.session_state.get("duplicate_jobs", {}).get((queue["page"], row["post_id"]))
+        if job is not None and not job.done():
+            with timed("duplicates.wait"):
+                wait([job], timeout=DUPLICATE_WAIT_SECONDS)
+            if not job.done():
+                st.caption("🔁 Still looking for reposts of this meme…")
+                # submitting without the callback only reruns this fragment
+                st.form_submit_button("Show reposts")
+        duplicates = row.get("duplicates") or []
+        if duplicates:
+            dup_pages = sorted({dup_page for dup_page, _, _ in duplicates})
+            st.checkbox(
+                f"🔁 Also apply these labels to the ticked repost(s) of this meme "
+                f"({', '.join(dup_pages)})",
+                key=f"propagate_{row['post_id']}",
+            )
+            with st.expander(f"{len(duplicates)} repost(s) found", expanded=True):
+                for start in range(0, len(duplicates), TRIAGE_COLUMNS):
+                    cells = zip(st.columns(TRIAGE_COLUMNS), duplicates[start:start + TRIAGE_COLUMNS])
+                    for i, (cell, (dup_page, dup_post, dup_path)) in enumerate(cells, start):
+                        with cell:
+                            try:
+                                st.image(load_thumbnail((*row["image_key"][:2], dup_path)), width="stretch")
+                            except Exception:
+                                st.caption("⚠️ Image could not be loaded")
+                            st.checkbox(f"{dup_page} / {dup_post}", value=True,
+                                        key=f"propagate_{i}_{row['post_id']}")
+
+        st.form_submit_button(
+            "➡️ Submit & Next", on_click=submit_annotation, args=(queue["page"], row["post_id"])
+        )
+        if "form_error" in st.session_state:
+            st.error(st.session_state.pop("form_error"))
+
+
+# ======================================================
+# TRIAGE GRID
+# ======================================================
+@st.fragment(key="triage_grid")
+def triage_grid():
+    queue = st.session_state["post_queue"]
+    rows = queue["rows"]
+    with timed("triage.thumbnails", posts=len(rows)):
+        futures = [get_thumbnail_loader().submit(load_thumbnail, row["image_key"]) for row in rows]
+        thumbnails = [f.result() if f.exception() is None else f.exception() for f in futures]
+    unseen = [row["post_id"] for row, t in zip(rows, thumbnails) if t is None or isinstance(t, Exception)]
+
+    with st.form("triage_form"):
+        st.markdown("### ⚡ Triage: tick the posts that **are** memes")
+        for start in range(0, len(rows), TRIAGE_COLUMNS):
+            cells = zip(st.columns(TRIAGE_COLUMNS), rows[start:start + TRIAGE_COLUMNS],
+                        thumbnails[start:start + TRIAGE_COLUMNS])
+            for cell, row, thumbnail in cells:
+                with cell:
+                    if thumbnail is None:
+                        st.caption("No image")
+                    elif isinstance(thumbnail, Exception):
+                        st.caption("⚠️ Image could not be loaded")
+                    else:
+                        st.image(thumbnail, width="stretch")
+                    if row.get("post_text"):
+                        st.caption(row["post_text"][:120])
+                    if row["post_id"] in unseen:
+                        st.caption("➡️ Goes to the full form")
+                    else:
+                        st.checkbox("Meme", key=f"triage_meme_{row['post_id']}")
+
+        st.form_submit_button(
+            "🚫 Mark unticked as not a meme", on_click=submit_triage,
+            args=(queue["page"], [row["post_id"] for row in rows], unseen),
+        )
+
+
+# ======================================================
+# PROGRESS
+# ======================================================
+@st.fragment(key="progress_panel")
+def progress_panel():
+    queue = st.session_state["post_queue"]
+    posts = queue["posts"]
+    done_ids = annotation_index.done_ids(queue["page"])
+
+    progress = min(len(done_ids) / posts.total, 1.0)
     st.progress(progress)
-    st.caption(f"{len(done_ids)} / {len(data)} annotated for {page_name}")
+    st.caption(
+        f"{len(done_ids)} / {posts.total} annotated for {queue['page']}"
+        + ("" if posts.complete else " (still loading posts…)")
+    )
+
 
 # ======================================================
-# LEFT MEME DISPLAY
+# ALL-PAGES DASHBOARD
 # ======================================================
-with col_meme:
-    st.markdown("### Nepali Meme Annotation Dashboard")
+def read_page_lines(owner, repo, path, sha):
+    mirror = get_page_mirror(owner, repo)
+    if mirror.has(path, sha):
+        return mirror.iter_lines(path)
+    return get_github_client(owner, repo).blob(path, sha).splitlines()
+
+
+@st.cache_resource
+def get_post_counts(owner, repo):
+    from progress_stats import PostCounts
+
+    return PostCounts(
+        lambda path, sha: read_page_lines(owner, repo, path, sha), max_workers=DASHBOARD_CONCURRENCY
+    )
+
+
+@st.cache_resource
+def get_annotation_stats():
+    from progress_stats import AnnotationStats
+
+    return AnnotationStats(get_annotation_store(), refresh_interval=DASHBOARD_REFRESH_SECONDS)
+
+
+@st.fragment(key="progress_dashboard", run_every=DASHBOARD_REFRESH_SECONDS)
+def progress_dashboard():
+    import pandas as pd
+
+    # only pages whose post file changed are recounted, and only new
+    # annotation rows are read, so a refresh is cheap after the first one
+    manifest = github_manifest(GITHUB_OWNER, GITHUB_REPO)
+    pages = github_list_folders(GITHUB_OWNER, GITHUB_REPO)
+    with timed("dashboard.refresh", pages=len(pages)):
+        counts = get_post_counts(GITHUB_OWNER, GITHUB_REPO).refresh(
+            {p: (f"{p}/facebook_posts.jsonl", manifest.blob_sha(f"{p}/facebook_posts.jsonl")) for p in pages}
+        )
+        stats = get_annotation_stats()
+        stats.refresh()
+
+        by_page = stats.by_page().reindex(pages)
+        by_page.insert(0, "posts", pd.Series(counts, dtype="Int64").reindex(pages))
+        for c in ("annotated", "labels", "annotators"):
+            by_page[c] = by_page[c].fillna(0).astype("Int64")
+        by_page["completion"] = (by_page["annotated"] / by_page["posts"]).clip(upper=1.0)
+
+    total_posts, total_done = by_page["posts"].sum(), by_page["annotated"].sum()
+    st.markdown(f"### 📊 All pages: {total_done} / {total_posts} posts annotated")
+    st.dataframe(
+        by_page.sort_values("completion"),
+        column_config={"completion": st.column_config.ProgressColumn("completion", min_value=0.0, max_value=1.0)},
+        width="stretch",
+    )
+    st.markdown("#### Annotators")
+    st.dataframe(
+        stats.by_annotator(),
+        column_config={"labels_per_hour": st.column_config.NumberColumn("labels / active hour", format="%.1f")},
+        width="stretch",
+    )
+    if len(counts) < len(pages):
+        st.caption(f"Post counts still missing for {len(pages) - len(counts)} pages.")
+
+
+# ======================================================
+# MEME DISPLAY
+# ======================================================
+@st.fragment(key="meme_panel")
+def meme_panel():
+    row = current_post()
     if row.get("post_text"):
         # st.markdown("---")
         st.markdown(f"🔗 **[Click here to view original post]({row['post_url']})**")
@@ -543,7 +1103,244 @@ with col_meme:
 
 
     try:
-        img = load_private_github_image(GITHUB_OWNER, GITHUB_REPO, f"{page_name}/{row['image_file']}")
-        st.image(img, use_column_width=True)
+        image_key = row["image_key"]
+        with timed("image.prefetch_wait"):
+            image_prefetcher.wait(image_key)
+        with timed("image.display", path=image_key[2]):
+            st.image(load_display_image(*image_key), width="stretch")
+        if st.toggle("🔍 View full size", key=f"full_size_{row['post_id']}", on_change=begin_timings):
+            st.image(load_private_github_image(*image_key))
     except:
         st.error("No image available for this post.")
+
+
+# ======================================================
+# STARTUP
+# ======================================================
+def last_page():
+    try:
+        with open(LAST_PAGE_PATH, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def remember_page(page_name):
+    # the page most recently opened by anyone is the one warmed after a restart
+    if page_name != last_page():
+        with open(LAST_PAGE_PATH, "w", encoding="utf-8") as f:
+            f.write(page_name)
+
+
+def warmup_page():
+    pages = github_list_folders(GITHUB_OWNER, GITHUB_REPO)
+    page_name = last_page()
+    return page_name if page_name in pages else (pages[0] if pages else None)
+
+
+def warm_page_posts():
+    page_name = warmup_page()
+    if page_name is not None:
+        load_page_jsonl(GITHUB_OWNER, GITHUB_REPO, page_name).wait()
+
+
+def warm_annotations():
+    get_annotation_index().refresh(page_name=warmup_page())
+
+
+@st.cache_resource(show_spinner=False)
+def get_startup():
+    startup = Startup(imports_ms=(time.perf_counter() - _imports_started) * 1000, log_path=STARTUP_LOG_PATH)
+    if STARTUP_WARMUP:
+        startup.warm_up([
+            ("imports", lambda: [importlib.import_module(m) for m in WARMUP_MODULES]),
+            ("sheets", get_annotation_store),
+            ("folders", lambda: github_list_folders(GITHUB_OWNER, GITHUB_REPO)),
+            ("page_posts", warm_page_posts),
+            ("annotations", warm_annotations),
+        ])
+    return startup
+
+
+startup = get_startup()
+
+# ======================================================
+# 🔐 AUTHENTICATION
+# ======================================================
+def login():
+    st.title("🔐 Login")
+
+    username = st.text_input("Username")
+    password = st.text_input("Password", type="password")
+
+    if st.button("Login"):
+        users = st.secrets["auth_users"]
+
+        if username in users and password == users[username]:
+            st.session_state["authenticated"] = True
+            st.session_state["username"] = username
+            st.rerun()
+        else:
+            st.error("❌ Invalid username or password")
+
+
+if "authenticated" not in st.session_state:
+    st.session_state["authenticated"] = False
+
+if not st.session_state["authenticated"]:
+    login()
+    startup.mark("login_page")
+    st.stop()
+
+annotator = st.session_state["username"]
+
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+session_id = st.session_state["session_id"]
+
+# ======================================================
+# TIMINGS
+# ======================================================
+def begin_timings():
+    # a rerun may end in st.stop()/st.rerun(), so the previous one is closed here;
+    # fragment reruns start from a widget callback instead of the top of the script
+    if "perf_rerun" in st.session_state:
+        st.session_state["perf_last"] = perf.finish_rerun(st.session_state["perf_rerun"])
+        perf.export(
+            st.session_state["perf_last"], PERF_LOG_PATH, PERF_PROM_PATH, max_log_bytes=PERF_LOG_MAX_MB * 1024 ** 2
+        )
+    st.session_state["perf_rerun"] = perf.begin_rerun(session_id, annotator)
+
+
+begin_timings()
+
+if annotator in st.secrets.get("admin_users", []) and "perf_last" in st.session_state:
+    last = st.session_state["perf_last"]
+    with st.sidebar.expander(f"⏱️ Last rerun: {last['total_ms']:.0f} ms", expanded=False):
+        st.dataframe(last["ops"], width="stretch")
+        remaining = [op["ratelimit_remaining"] for op in last["ops"] if op.get("ratelimit_remaining") is not None]
+        if remaining:
+            st.caption(f"GitHub rate limit remaining: {remaining[-1]}")
+    cold = startup.breakdown()
+    with st.sidebar.expander(f"🚀 Cold start ({cold['release'] or 'unknown release'})", expanded=False):
+        st.json(cold["marks"])
+        st.dataframe(cold["steps"], width="stretch")
+
+# ======================================================
+# SHARED RESOURCES
+# ======================================================
+annotation_store = get_annotation_store()
+submission_queue = get_submission_queue()
+annotation_index = get_annotation_index()
+work_scheduler = get_work_scheduler()
+image_prefetcher = get_image_prefetcher()
+
+# rows journalled but not yet in the store, and rows the store refused
+if submission_queue is not None and annotator in st.secrets.get("admin_users", []):
+    st.sidebar.caption(f"📤 Rows waiting to be written: {submission_queue.pending_count()}")
+    failed_rows = submission_queue.failed_count()
+    if failed_rows:
+        st.sidebar.warning(
+            f"⚠️ {failed_rows} row(s) were rejected by the annotation store and set aside "
+            f"in the `failed` table of {submission_queue.path}"
+        )
+
+# ======================================================
+# LAYOUT
+# ======================================================
+col_meme, col_ui = st.columns([4, 6])
+dashboard_area = st.container()
+
+# ======================================================
+# RIGHT UI
+# ======================================================
+with col_ui:
+    # same row: logout + dataset
+    c1, c2 = st.columns([1,4])
+
+    with c1:
+        st.markdown("👤 Logged in as: **" + annotator + "**")
+        if st.button("🚪 Logout"):
+            image_prefetcher.forget(session_id)
+            work_scheduler.release_session(session_id)
+            st.session_state.clear()
+            st.rerun()
+
+    with c2:
+        pages = github_list_folders(GITHUB_OWNER, GITHUB_REPO)
+        # new sessions open on the page most recently worked on, which the warm-up preloaded
+        recent = last_page()
+        page_name = st.selectbox(
+            "Select Page / Dataset", pages, key="page_select",
+            index=pages.index(recent) if recent in pages else 0,
+        )
+        remember_page(page_name)
+
+        # download the whole page once so annotation works without GitHub
+        page_mirror = get_page_mirror(GITHUB_OWNER, GITHUB_REPO)
+        synced = page_mirror.has_page(page_name)
+        if st.button("🔄 Refresh offline copy" if synced else "⬇️ Sync page for offline use", key="sync_page"):
+            try:
+                live_manifest = get_github_client(GITHUB_OWNER, GITHUB_REPO).manifest()
+                sync_bar = st.progress(0.0)
+                stats = page_mirror.sync_page(
+                    page_name, live_manifest, progress=lambda done, total: sync_bar.progress(done / total)
+                )
+                st.success(
+                    f"Synced **{page_name}**: {stats['downloaded']} downloaded, "
+                    f"{stats['unchanged']} unchanged, {stats['removed']} removed"
+                )
+            except OSError as e:
+                st.error(f"❌ Could not sync page: {e}")
+
+        # admins can hash a whole page up front so its reposts are offered for propagation
+        if annotator in st.secrets.get("admin_users", []) and st.button("🧬 Fingerprint page images", key="fingerprint_page"):
+            get_fingerprint_worker().submit(fingerprint_page, GITHUB_OWNER, GITHUB_REPO, page_name)
+            st.toast(f"Fingerprinting images of {page_name} in the background")
+
+        triage_mode = st.toggle(
+            "⚡ Triage mode", key="triage_mode",
+            help="Mark many posts as 'not a meme' at once from a grid of thumbnails; "
+                 "ticked posts then go through the full form.",
+        )
+
+        # the all-pages overview replaces the annotation view until switched off
+        show_dashboard = annotator in st.secrets.get("admin_users", []) and st.toggle(
+            "📊 All pages progress", key="progress_dashboard_toggle"
+        )
+
+    if show_dashboard:
+        with dashboard_area:
+            progress_dashboard()
+        st.stop()
+
+    posts = load_page_jsonl(GITHUB_OWNER, GITHUB_REPO, page_name)
+
+    if not assign_posts(page_name, posts, triage=triage_mode):
+        if st.session_state["post_queue"]["blocked"]:
+            st.info(f"⏳ The remaining posts of **{page_name}** are currently assigned to other annotators. Check back shortly.")
+        else:
+            st.success(f"🎉 All annotations completed for **{page_name}**")
+        st.stop()
+
+    # the form, progress bar and meme (or the triage grid) each rerun on their own
+    if not triage_mode:
+        label_form()
+    progress_panel()
+
+# ======================================================
+# LEFT MEME DISPLAY
+# ======================================================
+with col_meme:
+    st.markdown("### Nepali Meme Annotation Dashboard")
+    if triage_mode:
+        st.caption("Triage mode: everything not ticked in the grid below is saved as *not a meme*; posts without a thumbnail go to the full form.")
+    else:
+        meme_panel()
+
+# full width under both columns
+if triage_mode:
+    triage_grid()
+
+# the process has shown its first post; completes the start-up breakdown
+startup.first_page()
@@ -0,0 +1,167 @@
+"""
+Drive app.py through Streamlit's AppTest against local stand-ins and report
+per-rerun latency, API call counts and peak memory.
+
+    python -m benchmarks.bench_app --rows 50000 --posts 20000 --sessions 4 --submits 20
+
+Nothing leaves the machine: GitHub is a local HTTP server serving synthetic
+`facebook_posts.jsonl` files and images, and the annotation sheet is an
+in-memory worksheet. `--shared redis` runs the shared cache against a local
+Redis stand-in.
+
+Sessions are interleaved on one thread, one rerun each in turn: AppTest
+patches process-wide secrets and runtime state, so two AppTests must never
+run at the same time. The app's own background workers still run
+concurrently. Reruns that a failing session never got to are reported as
+aborted, and the command exits non-zero if any session failed.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.fakes import FakeGitHub, FakeRedis, FakeWorksheet, synthetic_annotations, synthetic_posts
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def session(name, args, latencies):
+    """One annotator's reruns; yields after each, raises when the session fails."""
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    at.secrets["auth_users"] = {name: "x"}
+    at.secrets["gcp_service_account"] = {}
+    at.secrets["GITHUB_TOKEN"] = "benchmark"
+    at.session_state["authenticated"] = True
+    at.session_state["username"] = name
+
+    def timed_run():
+        start = time.perf_counter()
+        at.run()
+        latencies.append((name, time.perf_counter() - start))
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    timed_run()
+    yield
+    for _ in range(args.submits):
+        meme = [r for r in at.radio if r.label == "Is this a meme?"]
+        submit = [b for b in at.button if "Submit" in b.label]
+        if not meme or not submit:
+            raise RuntimeError("no annotation form to submit")
+        meme[0].set_value("No")
+        submit[0].click()
+        timed_run()
+        yield
+
+
+def run_sessions(args, latencies, errors):
+    """Round-robin over the sessions until all are done; returns the number of reruns that never ran."""
+    sessions = {f"annotator{i}": session(f"annotator{i}", args, latencies) for i in range(args.sessions)}
+    done = {name: 0 for name in sessions}
+    while sessions:
+        for name, steps in list(sessions.items()):
+            try:
+                next(steps)
+                done[name] += 1
+            except StopIteration:
+                del sessions[name]
+            except Exception as e:
+                errors.append(f"{name}: {type(e).__name__}: {e}")
+                del sessions[name]
+    return sum(1 + args.submits - n for n in done.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for app.py")
+    parser.add_argument("--pages", type=int, default=3, help="number of page folders")
+    parser.add_argument("--posts", type=int, default=20000, help="posts per page")
+    parser.add_argument("--rows", type=int, default=50000, help="existing annotation rows")
+    parser.add_argument("--sessions", type=int, default=4, help="interleaved annotator sessions")
+    parser.add_argument("--submits", type=int, default=20, help="submissions per session")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated GitHub latency in seconds")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout in seconds")
+    parser.add_argument("--shared", choices=["none", "file", "redis"], default="none",
+                        help="shared cache backend for the app (redis uses a local stand-in)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    pages = [f"page{i}" for i in range(args.pages)]
+    files = {f"{p}/facebook_posts.jsonl": synthetic_posts(p, args.posts) for p in pages}
+    images = [f"{p}/images/{i}.jpg" for p in pages for i in range(args.posts)]
+    github = FakeGitHub(files, images, latency=args.latency).start()
+    github.tree()  # hash every synthetic file up front, outside the timed runs
+    sheet = FakeWorksheet(synthetic_annotations(pages, args.rows))
+
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    workdir = tempfile.mkdtemp(prefix="bench_app_")
+    os.chdir(workdir)
+    os.environ["GITHUB_API_URL"] = github.url
+    redis = None
+    if args.shared == "redis":
+        redis = FakeRedis().start()
+        os.environ["SHARED_CACHE_URL"] = redis.url
+    elif args.shared == "file":
+        os.environ["SHARED_CACHE_URL"] = os.path.join(workdir, "shared_cache")
+
+    latencies = []
+    errors = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    with mock.patch("annotation_store.open_worksheet", return_value=sheet):
+        aborted = run_sessions(args, latencies, errors)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    github.stop()
+    if redis is not None:
+        redis.stop()
+
+    ms = [s * 1000 for _, s in latencies]
+    report = {
+        "config": vars(args),
+        "reruns": len(ms),
+        "aborted_reruns": aborted,
+        "elapsed_s": round(elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(ms, 0.50), 1),
+            "p90": round(percentile(ms, 0.90), 1),
+            "p99": round(percentile(ms, 0.99), 1),
+            "max": round(max(ms, default=0), 1),
+            "mean": round(statistics.fmean(ms), 1) if ms else 0,
+        },
+        "github_calls": github.calls,
+        "sheet_calls": sheet.calls,
+        "redis_calls": redis.calls if redis is not None else None,
+        "peak_traced_mb": round(peak / 1024 ** 2, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "errors": errors[:20],
+        "workdir": workdir,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if errors or aborted:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
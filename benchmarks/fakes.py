@@ -0,0 +1,304 @@
+"""
+Local stand-ins for the GitHub contents API, a gspread worksheet and Redis.
+"""
+import functools
+import hashlib
+import io
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from annotation_store import ANNOTATION_COLUMNS
+from shared_cache import _read_reply
+
+
+# ======================================================
+# SYNTHETIC DATA
+# ======================================================
+def synthetic_posts(page_name, n, seed=0):
+    rng = random.Random(f"{page_name}-{seed}")
+    lines = []
+    for i in range(n):
+        lines.append(json.dumps({
+            "post_id": f"{page_name}_{i}",
+            "post_text": " ".join(rng.choice(["meme", "नेपाल", "haha", "news", "lol"]) for _ in range(rng.randint(3, 40))),
+            "post_url": f"https://facebook.com/{page_name}/posts/{i}",
+            "image_file": f"images/{i}.jpg",
+            # fields the app never reads, present in the real export
+            "reactions": {"like": rng.randint(0, 5000), "haha": rng.randint(0, 5000)},
+            "comments": [{"text": "x" * rng.randint(0, 200)} for _ in range(rng.randint(0, 5))],
+            "scraped_at": "2024-01-01T00:00:00",
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode()
+
+
+@functools.lru_cache(maxsize=16)
+def _base_jpeg(color, size):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def synthetic_image(seed, size=(1080, 1080)):
+    # one encode per colour; a JPEG comment segment makes every file's bytes
+    # (and so its blob SHA) unique without re-encoding
+    rng = random.Random(seed)
+    base = _base_jpeg(rng.choice(_COLORS), size)
+    comment = str(seed).encode()[:60000]
+    return base[:2] + b"\xff\xfe" + (len(comment) + 2).to_bytes(2, "big") + comment + base[2:]
+
+
+_COLORS = [(200, 40, 40), (40, 200, 40), (40, 40, 200), (220, 220, 60), (30, 30, 30), (240, 240, 240)]
+
+
+def git_blob_sha(data):
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def synthetic_annotations(pages, n, annotators=12, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        page = rng.choice(pages)
+        rows.append([
+            page, f"{page}_{i}", f"annotator{rng.randrange(annotators)}", rng.choice(["Yes", "No"]),
+            "Neutral", "", "No", "None", "No", "No Harm", "", "Joy", "Image",
+            f"2024-01-01T00:00:{i % 60:02d}",
+        ])
+    return rows
+
+
+# ======================================================
+# FAKE GITHUB
+# ======================================================
+class FakeGitHub:
+    """
+    Serves /repos/{owner}/{repo}/contents/{path} from an in-memory file map,
+    with ETags and 304s like the real API, and the recursive Git Trees
+    listing for it. Counts requests per kind. Images listed in `images` are
+    generated on request, so large pages do not need them held in memory.
+    """
+
+    def __init__(self, files, images=(), latency=0.0):
+        self.files = files          # path -> bytes
+        self.images = set(images)   # paths served by synthetic_image
+        self.latency = latency
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    @functools.cached_property
+    def _tree(self):
+        entries = []
+        dirs = set()
+        for path, data in self.files.items():
+            entries.append({"path": path, "type": "blob", "sha": git_blob_sha(data), "size": len(data)})
+        for path in self.images:
+            data = synthetic_image(path)
+            entries.append({"path": path, "type": "blob", "sha": git_blob_sha(data), "size": len(data)})
+        for path in list(self.files) + list(self.images):
+            parts = path.split("/")[:-1]
+            for i in range(1, len(parts) + 1):
+                dirs.add("/".join(parts[:i]))
+        entries += [{"path": d, "type": "tree", "sha": hashlib.sha1(d.encode()).hexdigest()} for d in dirs]
+        return {"sha": "fake", "truncated": False, "tree": sorted(entries, key=lambda e: e["path"])}
+
+    def tree(self):
+        return self._tree
+
+    def _handle(self, req):
+        if self.latency:
+            threading.Event().wait(self.latency)
+        path = req.path.split("?", 1)[0]
+        if re.match(r"^/repos/[^/]+/[^/]+/git/trees/", path):
+            self._count("tree")
+            return self._respond(req, json.dumps(self.tree()).encode())
+        m = re.match(r"^/repos/[^/]+/[^/]+/contents/?(.*)$", path)
+        if not m:
+            self._count("404")
+            req.send_response(404)
+            req.end_headers()
+            return
+        path = m.group(1)
+
+        if path == "" or path.endswith("/"):
+            self._count("list")
+            prefix = path
+            names = sorted({p[len(prefix):].split("/")[0] for p in self.files if p.startswith(prefix) and "/" in p[len(prefix):]})
+            body = json.dumps([{"name": n, "type": "dir"} for n in names]).encode()
+        elif path in self.files:
+            self._count("jsonl" if path.endswith(".jsonl") else "file")
+            body = self.files[path]
+        elif path in self.images:
+            self._count("image")
+            body = synthetic_image(path)
+        else:
+            self._count("404")
+            req.send_response(404)
+            req.end_headers()
+            return
+        self._respond(req, body)
+
+    def _respond(self, req, body):
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if req.headers.get("If-None-Match") == etag:
+            self._count("304")
+            req.send_response(304)
+            req.send_header("ETag", etag)
+            req.end_headers()
+            return
+        req.send_response(200)
+        req.send_header("ETag", etag)
+        req.send_header("Content-Length", str(len(body)))
+        req.send_header("X-RateLimit-Remaining", "4999")
+        req.end_headers()
+        req.wfile.write(body)
+
+
+# ======================================================
+# FAKE WORKSHEET
+# ======================================================
+class FakeWorksheet:
+    """The subset of gspread.Worksheet the stores use, kept in memory."""
+
+    def __init__(self, rows=(), title="sheet1"):
+        self.title = title
+        self.rows = [list(ANNOTATION_COLUMNS)] + [list(r) for r in rows]
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _count(self, kind):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def get_values(self, range_name=None, **kwargs):
+        with self._lock:
+            self._count("get_values")
+            if range_name is None:
+                return [[str(v) for v in r] for r in self.rows]
+            start = int(re.match(r"[A-Z]+(\d+)", range_name).group(1))
+            return [[str(v) for v in r] for r in self.rows[start - 1:]]
+
+    def get_all_records(self):
+        with self._lock:
+            self._count("get_all_records")
+            return [dict(zip(self.rows[0], r)) for r in self.rows[1:]]
+
+    def col_values(self, col):
+        with self._lock:
+            self._count("col_values")
+            return [r[col - 1] for r in self.rows]
+
+    def append_rows(self, rows, **kwargs):
+        with self._lock:
+            self._count("append_rows")
+            self.rows.extend(list(r) for r in rows)
+
+    def append_row(self, row, **kwargs):
+        self.append_rows([row])
+
+
+# ======================================================
+# FAKE REDIS
+# ======================================================
+class FakeRedis:
+    """
+    A RESP server speaking the commands RedisSharedCache sends (GET, SET with
+    NX/PX/EX, DEL, AUTH, SELECT, PING), with values kept in memory. Counts
+    commands per name.
+    """
+
+    def __init__(self):
+        self.data = {}      # key -> (value, expiry as monotonic time or None)
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        args = _read_reply(self.rfile)
+                    except (ConnectionError, OSError):
+                        return
+                    self.wfile.write(fake._command(args))
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"redis://{host}:{port}/0"
+
+    def _command(self, args):
+        name = args[0].decode().upper()
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            now = time.monotonic()
+            if name in ("PING", "AUTH", "SELECT"):
+                return b"+OK\r\n" if name != "PING" else b"+PONG\r\n"
+            if name == "GET":
+                value = self._get(args[1], now)
+                return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            if name == "SET":
+                key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+                if b"NX" in options and self._get(key, now) is not None:
+                    return b"$-1\r\n"
+                expiry = None
+                if b"PX" in options:
+                    expiry = now + int(options[options.index(b"PX") + 1]) / 1000
+                elif b"EX" in options:
+                    expiry = now + int(options[options.index(b"EX") + 1])
+                self.data[key] = (value, expiry)
+                return b"+OK\r\n"
+            if name == "DEL":
+                removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+                return b":%d\r\n" % removed
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+    def _get(self, key, now):
+        value, expiry = self.data.get(key, (None, None))
+        if expiry is not None and expiry < now:
+            del self.data[key]
+            return None
+        return value
@@ -0,0 +1,174 @@
+"""
+Export annotations joined to their posts as a partitioned Parquet dataset,
+with inter-annotator agreement reports.
+
+    python export_dataset.py --out dataset
+    python export_dataset.py --out dataset --backend sqlite --db annotations.db PAGE ...
+
+Pages are processed one at a time: a page's annotations are read, joined
+to its facebook_posts.jsonl (from the local mirror when synced, else
+GitHub) and written out before the next page is loaded.
+
+    dataset/annotations/page_name=<page>/part-0.parquet   one row per post and annotator
+    dataset/agreement/summary.csv                          Fleiss' and mean Cohen's kappa per label
+    dataset/agreement/pairs.csv                            Cohen's kappa per annotator pair and label
+    dataset/agreement/confusion_<label>.csv                pooled confusion matrix per label
+"""
+import argparse
+import os
+import tomllib
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from agreement import AgreementAccumulator
+from annotation_store import (
+    ANNOTATION_COLUMNS, SheetsStore, ShardedSheetsStore, SQLiteStore, open_spreadsheet,
+)
+from github_client import GitHubClient
+from page_loader import PagePosts
+from page_mirror import PageMirror
+
+SECRETS_PATH = ".streamlit/secrets.toml"
+SHEET_NAME = "annotation_db"
+GITHUB_OWNER = "sajalkuikel"
+GITHUB_REPO = "nepali_memes"
+GITHUB_BRANCH = "main"
+MIRROR_DIR = ".mirror"
+
+# every column between annotator and timestamp is a label
+LABEL_COLUMNS = ANNOTATION_COLUMNS[3:-1]
+ROW_KEY = ["page_name", "post_id", "annotator"]
+
+
+# ======================================================
+# SOURCES
+# ======================================================
+def open_store(args, secrets):
+    if args.backend == "sqlite":
+        return SQLiteStore(args.db)
+    spreadsheet = open_spreadsheet(secrets["gcp_service_account"], args.sheet)
+    if args.backend == "sheets-sharded":
+        return ShardedSheetsStore(spreadsheet)
+    return SheetsStore(spreadsheet.sheet1)
+
+
+def annotation_frame(rows):
+    # one row per post and annotator: a resubmission replaces the earlier label
+    frame = pd.DataFrame(rows, columns=ANNOTATION_COLUMNS).astype(str)
+    return frame.drop_duplicates(subset=ROW_KEY, keep="last")
+
+
+def iter_pages(store, pages):
+    """
+    (page_name, annotations) per page. Sharded and SQLite stores are read one
+    page at a time; a single sheet can only be read whole and is split here.
+    """
+    if store.page_reads:
+        for page_name in pages:
+            rows, _ = store.read_page_since(page_name)
+            if rows:
+                yield page_name, annotation_frame(rows)
+        return
+
+    rows, _ = store.read_since(None)
+    frame = annotation_frame(rows)
+    if pages is not None:
+        frame = frame[frame["page_name"].isin(pages)]
+    for page_name, page_frame in frame.groupby("page_name", sort=True):
+        if page_name:
+            yield page_name, page_frame
+
+
+def load_posts(client, mirror, manifest, page_name):
+    path = f"{page_name}/facebook_posts.jsonl"
+    sha = manifest.blob_sha(path)
+    posts = PagePosts()
+    if mirror.has(path, sha):
+        posts.feed(mirror.iter_lines(path))
+    elif sha is not None:
+        posts.feed(client.blob(path, sha).splitlines())
+    else:
+        posts.feed([])
+    return posts.frame()
+
+
+# ======================================================
+# OUTPUT
+# ======================================================
+def page_table(annotations, posts):
+    data = annotations.merge(posts, on="post_id", how="left").drop(columns="page_name")
+    for c in data.columns:
+        data[c] = data[c].astype("category" if c in LABEL_COLUMNS else "string")
+    # labels become dictionary-encoded columns
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def write_page(out, page_name, table, fmt):
+    # hive-style partition directory; readers URI-decode the page name
+    directory = os.path.join(out, "annotations", f"page_name={quote(page_name, safe='')}")
+    os.makedirs(directory, exist_ok=True)
+    if fmt == "arrow":
+        feather.write_feather(table, os.path.join(directory, "part-0.arrow"))
+    else:
+        pq.write_table(table, os.path.join(directory, "part-0.parquet"))
+
+
+def write_agreement(out, agreement):
+    directory = os.path.join(out, "agreement")
+    os.makedirs(directory, exist_ok=True)
+    summary = agreement.summary()
+    summary.to_csv(os.path.join(directory, "summary.csv"), index=False)
+    agreement.pairs().to_csv(os.path.join(directory, "pairs.csv"), index=False)
+    for label in LABEL_COLUMNS:
+        agreement.confusion(label).to_csv(os.path.join(directory, f"confusion_{label}.csv"))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="pages to export (default: all annotated pages)")
+    parser.add_argument("--out", default="dataset", help="output directory")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--backend", choices=["sheets", "sheets-sharded", "sqlite"], default="sheets")
+    parser.add_argument("--db", default="annotations.db", help="SQLite database path")
+    parser.add_argument("--sheet", default=SHEET_NAME, help="Google spreadsheet name")
+    parser.add_argument("--mirror", default=MIRROR_DIR, help="page mirror directory")
+    parser.add_argument("--secrets", default=SECRETS_PATH, help="Streamlit secrets file")
+    args = parser.parse_args()
+
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+
+    store = open_store(args, secrets)
+    client = GitHubClient(GITHUB_OWNER, GITHUB_REPO, GITHUB_BRANCH, secrets["GITHUB_TOKEN"])
+    mirror = PageMirror(client, root=args.mirror)
+    try:
+        manifest = client.manifest()
+    except OSError:
+        manifest = mirror.manifest()
+        if manifest is None:
+            raise
+
+    pages = args.pages or None
+    if pages is None and isinstance(store, SQLiteStore):
+        pages = store.page_names()
+    elif pages is None and store.sharded:
+        pages = manifest.dirs()
+
+    agreement = AgreementAccumulator(LABEL_COLUMNS)
+    for page_name, annotations in iter_pages(store, pages):
+        posts = load_posts(client, mirror, manifest, page_name)
+        write_page(args.out, page_name, page_table(annotations, posts), args.format)
+        agreement.add(annotations)
+        print(f"{page_name}: {len(annotations)} annotations of {annotations['post_id'].nunique()} posts")
+
+    summary = write_agreement(args.out, agreement)
+    print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
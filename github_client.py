@@ -0,0 +1,371 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from perf import timed
+from shared_cache import SharedCacheError
+
+API_URL = "https://api.github.com"
+ACCEPT_JSON = "application/vnd.github+json"
+ACCEPT_RAW = "application/vnd.github.raw"
+
+
+# ======================================================
+# GITHUB CLIENT
+# ======================================================
+class GitHubClient:
+    """
+    Revalidating access to the contents API of one repository.
+
+    All requests share a pooled keep-alive session. ETags are remembered
+    (and persisted, so they survive restarts) and sent back as
+    `If-None-Match`; an unchanged file then costs a 304, which GitHub does
+    not count against the rate limit. Within `revalidate_after` seconds of
+    the last check a path is served from cache without any request.
+
+    With a `shared` cache (see shared_cache.py), blobs and the tree listing
+    are fetched once for all app replicas rather than once per process.
+    Shared blobs expire after `blob_ttl` seconds, so pages nobody opens any
+    more do not stay in the cache forever.
+    """
+
+    def __init__(self, owner, repo, branch, token, api_url=API_URL, revalidate_after=60.0,
+                 cache_dir=".github_cache", timeout=30, shared=None, blob_ttl=7 * 24 * 3600):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.api_url = api_url.rstrip("/")
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self.shared = shared
+        self.blob_ttl = blob_ttl
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._checked = {}    # url -> monotonic time of last 200/304
+        self._values = {}     # url -> parsed value kept by `cached()`
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "etags.db"),
+                                   check_same_thread=False, isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS etags (url TEXT PRIMARY KEY, etag TEXT NOT NULL)")
+        self._etags = dict(self._db.execute("SELECT url, etag FROM etags").fetchall())
+
+    def contents_url(self, path):
+        return f"{self.api_url}/repos/{self.owner}/{self.repo}/contents/{path}?ref={self.branch}"
+
+    def tree_url(self, tree=None):
+        return f"{self.api_url}/repos/{self.owner}/{self.repo}/git/trees/{tree or self.branch}?recursive=1"
+
+    # ---------------- requests ----------------
+    def get(self, path, accept=ACCEPT_RAW, conditional=True, stream=False):
+        """
+        GET a contents path. With `conditional`, the stored ETag is sent and a
+        304 response is returned as-is; callers then keep their cached copy.
+        """
+        return self._get(self.contents_url(path), path, accept, conditional, stream)
+
+    def _get(self, url, label, accept, conditional, stream, etag=None):
+        # `etag` overrides the stored one, e.g. for a copy kept in the shared cache
+        headers = {"Accept": accept}
+        if etag is None:
+            with self._lock:
+                etag = self._etags.get(url)
+        if conditional and etag:
+            headers["If-None-Match"] = etag
+
+        with timed("github.get", path=label) as rec:
+            r = self.session.get(url, headers=headers, stream=stream, timeout=self.timeout)
+            rec["status"] = r.status_code
+            rec["cache"] = "hit" if r.status_code == 304 else "miss"
+            rec["bytes"] = int(r.headers.get("Content-Length") or 0) if stream else len(r.content)
+            remaining = r.headers.get("X-RateLimit-Remaining")
+            rec["ratelimit_remaining"] = int(remaining) if remaining is not None else None
+            if r.status_code != 304:
+                r.raise_for_status()
+
+        with self._lock:
+            self._checked[url] = time.monotonic()
+            new_etag = r.headers.get("ETag")
+            if r.status_code == 200 and new_etag and new_etag != etag:
+                self._etags[url] = new_etag
+                self._db.execute("INSERT OR REPLACE INTO etags (url, etag) VALUES (?, ?)", (url, new_etag))
+        return r
+
+    def is_fresh(self, path):
+        return self._is_fresh(self.contents_url(path))
+
+    def _is_fresh(self, url):
+        checked = self._checked.get(url)
+        return checked is not None and time.monotonic() - checked < self.revalidate_after
+
+    def cached(self, path, parse, accept=ACCEPT_RAW, stream=False, sha=None):
+        """
+        Return `parse(response)` for `path`, re-running it only when GitHub
+        reports the content changed. When the caller already knows the blob
+        `sha` (from the manifest) and it matches the cached value's, no
+        request is made at all.
+        """
+        return self._cached(self.contents_url(path), path, parse, accept, stream, sha)
+
+    def forget(self, path):
+        """Drop the cached value of `path`, so the next `cached()` downloads it again."""
+        url = self.contents_url(path)
+        with self._lock:
+            self._values.pop(url, None)
+            self._checked.pop(url, None)
+
+    def _cached(self, url, label, parse, accept, stream, sha=None):
+        with self._lock:
+            have = url in self._values
+            cached_value, cached_sha = self._values.get(url, (None, None))
+        with timed("github.cached", path=label) as rec:
+            if have and sha is not None and sha == cached_sha:
+                rec["cache"] = "sha"
+                return cached_value
+            if have and sha is None and self._is_fresh(url):
+                rec["cache"] = "fresh"
+                return cached_value
+
+            try:
+                r = self._get(url, label, accept, conditional=have and sha is None, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if not have:
+                    raise
+                # GitHub unreachable: keep serving what we have until the next check is due
+                rec["cache"] = "stale"
+                with self._lock:
+                    self._checked[url] = time.monotonic()
+                return cached_value
+            if r.status_code == 304:
+                rec["cache"] = "revalidated"
+                r.close()
+                return cached_value
+
+            rec["cache"] = "miss"
+            value = parse(r)
+        with self._lock:
+            self._values[url] = (value, sha)
+        return value
+
+    # ---------------- blobs ----------------
+    def blob(self, path, sha):
+        """
+        Raw content of `path` at blob `sha`. Blobs never change, so with a
+        shared cache each one is downloaded by a single replica per `blob_ttl`.
+        """
+        if self.shared is None:
+            return self.get(path, conditional=False).content
+        return self.shared.get_or_fetch(
+            f"github:blob:{self.owner}/{self.repo}/{sha}",
+            lambda: self.get(path, conditional=False).content,
+            ttl=self.blob_ttl,
+        )
+
+    def cached_blob(self, path, sha, parse):
+        """`parse(content)` of `path` at blob `sha`, re-parsed only when the SHA changes."""
+        url = self.contents_url(path)
+        with self._lock:
+            value, cached_sha = self._values.get(url, (None, None))
+        with timed("github.cached", path=path) as rec:
+            if cached_sha is not None and cached_sha == sha:
+                rec["cache"] = "sha"
+                return value
+            rec["cache"] = "miss"
+            value = parse(self.blob(path, sha))
+        with self._lock:
+            self._values[url] = (value, sha)
+        return value
+
+    # ---------------- manifest ----------------
+    def manifest(self):
+        """
+        The whole repository tree from one recursive Git Trees call,
+        revalidated like any other cached resource.
+        """
+        if self.shared is not None:
+            return self._shared_manifest()
+        return self._cached(self.tree_url(), "git/trees", lambda r: RepoManifest(r.json()), ACCEPT_JSON, False)
+
+    def _shared_manifest(self):
+        # one replica revalidates the tree per revalidation period (a 304 when
+        # nothing changed) and leaves its ETag behind; the others only read the
+        # listing itself when that ETag differs from the one they parsed
+        url = self.tree_url()
+        key = f"github:tree:{self.owner}/{self.repo}/{self.branch}"
+        with self._lock:
+            have = url in self._values
+            value, version = self._values.get(url, (None, None))
+        if have and self._is_fresh(url):
+            return value
+        fetched = {}
+        try:
+            etag = self.shared.get_or_fetch(
+                f"{key}:checked", lambda: self._revalidate_tree(url, key, fetched), ttl=self.revalidate_after,
+            ).decode()
+            data = None
+            if etag != version:
+                data = fetched.get(etag) or self._shared_tree(key, etag)
+                if data is None:
+                    data = self._get(url, "git/trees", ACCEPT_JSON, conditional=False, stream=False).content
+        except (requests.ConnectionError, requests.Timeout):
+            if not have:
+                raise
+            data = None
+        with self._lock:
+            self._checked[url] = time.monotonic()
+            if data is not None:
+                value = RepoManifest(json.loads(data))
+                self._values[url] = (value, etag)
+        return value
+
+    def folders(self, path=""):
+        """
+        Names of the directories directly under `path`, from the contents API.
+        Unlike `manifest().dirs()` this is complete even when the recursive
+        tree was truncated.
+        """
+        return sorted(e["name"] for e in self._listing(path) if e["type"] == "dir")
+
+    def subtree(self, path):
+        """
+        Manifest of everything under directory `path`, from a recursive tree
+        call on that directory alone. Use it where a truncated `manifest()`
+        may be missing some of the directory's files.
+        """
+        parent, _, name = path.strip("/").rpartition("/")
+        sha = next((e["sha"] for e in self._listing(parent) if e["type"] == "dir" and e["name"] == name), None)
+        if sha is None:
+            return RepoManifest({"tree": []}, prefix=path)
+        # trees are addressed by content, so a known SHA is never downloaded twice
+        return self._cached(self.tree_url(sha), f"git/trees/{path}",
+                            lambda r: RepoManifest(r.json(), prefix=path), ACCEPT_JSON, False)
+
+    def _listing(self, path):
+        return self._cached(self.contents_url(path), path or "/", lambda r: r.json(), ACCEPT_JSON, False)
+
+    def _revalidate_tree(self, url, key, fetched):
+        # the shared copy is stored as b"<etag>\n<listing>" and kept until it changes
+        etag, data = None, None
+        try:
+            stored = self.shared.get(key)
+        except SharedCacheError:
+            stored = None
+        if stored is not None:
+            etag, _, data = stored.partition(b"\n")
+            etag = etag.decode()
+        # only a real ETag can be sent back; a content digest stands in when GitHub gave none
+        real = etag if etag and not etag.startswith("sha1:") else ""
+        r = self._get(url, "git/trees", ACCEPT_JSON, conditional=bool(real), stream=False, etag=real)
+        if r.status_code == 304:
+            r.close()
+            fetched[etag] = data
+            return etag.encode()
+        etag = r.headers.get("ETag") or f"sha1:{hashlib.sha1(r.content).hexdigest()}"
+        fetched[etag] = r.content
+        try:
+            self.shared.set(key, etag.encode() + b"\n" + r.content)
+        except SharedCacheError:
+            pass
+        return etag.encode()
+
+    def _shared_tree(self, key, etag):
+        try:
+            stored = self.shared.get(key)
+        except SharedCacheError:
+            return None
+        if stored is None:
+            return None
+        stored_etag, _, data = stored.partition(b"\n")
+        return data if stored_etag.decode() == etag else None
+
+
+# ======================================================
+# REPOSITORY MANIFEST
+# ======================================================
+class RepoManifest:
+    """
+    Blob SHA and size of every file in the repository, plus its directories.
+
+    GitHub truncates very large trees; a truncated manifest still answers for
+    the paths it has, but cannot prove a path is missing, and may lack whole
+    directories (see `GitHubClient.folders` and `GitHubClient.subtree`).
+    The entries of a subtree listing are relative to it; `prefix` makes them
+    repository paths again.
+    """
+
+    def __init__(self, tree, prefix=""):
+        prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+        self.sha = tree.get("sha")
+        self.truncated = bool(tree.get("truncated"))
+        self.blobs = {}     # path -> (sha, size)
+        self._dirs = set()
+        self._by_sha = None     # sha -> [path], built on first use
+        for entry in tree.get("tree", []):
+            if entry["type"] == "blob":
+                self.blobs[prefix + entry["path"]] = (entry["sha"], entry.get("size"))
+            elif entry["type"] == "tree":
+                self._dirs.add(prefix + entry["path"])
+
+    def dirs(self, path=""):
+        """Names of the directories directly under `path`."""
+        prefix = f"{path.strip('/')}/" if path.strip("/") else ""
+        return sorted(
+            d[len(prefix):] for d in self._dirs
+            if d.startswith(prefix) and "/" not in d[len(prefix):]
+        )
+
+    def to_tree(self):
+        """The Git Trees response this manifest can be rebuilt from."""
+        tree = [{"path": p, "type": "blob", "sha": sha, "size": size} for p, (sha, size) in self.blobs.items()]
+        tree += [{"path": d, "type": "tree"} for d in sorted(self._dirs)]
+        return {"sha": self.sha, "truncated": self.truncated, "tree": tree}
+
+    def with_subtrees(self, subtrees):
+        """
+        A copy of this manifest whose entries under each directory in
+        `subtrees` ({path: manifest}) come from that manifest instead.
+        """
+        prefixes = tuple(f"{p.strip('/')}/" for p in subtrees)
+        tree = self.to_tree()
+        tree["tree"] = [e for e in tree["tree"] if not e["path"].startswith(prefixes)]
+        for path, subtree in subtrees.items():
+            prefix = f"{path.strip('/')}/"
+            entries = [e for e in subtree.to_tree()["tree"] if e["path"].startswith(prefix)]
+            tree["tree"] += entries
+            if entries and path.strip("/") not in self._dirs:
+                tree["tree"].append({"path": path.strip("/"), "type": "tree"})
+        return RepoManifest(tree)
+
+    def blob(self, path):
+        return self.blobs.get(path)
+
+    def blob_sha(self, path):
+        entry = self.blobs.get(path)
+        return entry[0] if entry else None
+
+    def paths_with_sha(self, sha):
+        """Every path whose content is the blob `sha` (byte-identical copies)."""
+        if self._by_sha is None:
+            by_sha = {}
+            for path, (blob_sha, _) in self.blobs.items():
+                by_sha.setdefault(blob_sha, []).append(path)
+            self._by_sha = by_sha
+        return self._by_sha.get(sha, [])
+
+    def exists(self, path):
+        """True/False, or None when a truncated tree cannot tell."""
+        if path in self.blobs:
+            return True
+        return None if self.truncated else False
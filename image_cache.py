@@ -0,0 +1,237 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from perf import timed
+
+
+def git_blob_sha(data):
+    # same id GitHub reports for the blob, so disk entries line up with the API
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+# ======================================================
+# TWO-TIER IMAGE CACHE
+# ======================================================
+class ImageCache:
+    """
+    Decoded images in a byte-capped in-memory LRU, encoded originals in a
+    content-addressed on-disk store with its own size budget.
+
+    Disk blobs are named by their git blob SHA; a small SQLite index maps
+    each `owner/repo/path` key to the SHA it last resolved to, so a restarted
+    process finds its images again without touching the network.
+    """
+
+    def __init__(self, directory, memory_bytes=64 * 1024 ** 2, disk_bytes=1024 ** 3):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()   # key -> (sha, image or encoded bytes, nbytes)
+        self._memory_used = 0
+
+        self._db = sqlite3.connect(os.path.join(directory, "index.db"),
+                                   check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, sha TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (sha TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._disk_used = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    # ---------------- lookups ----------------
+    def get(self, key):
+        # disk reads and decodes run outside the lock, so one slow image never
+        # holds up the other threads' memory hits
+        hit, sha = self._lookup(key)
+        if hit is not None or sha is None:
+            return hit
+        data = self.read_blob(sha)
+        if data is None:
+            return None
+        return self._remember_read(key, sha, _decode(data), image_nbytes)
+
+    def get_bytes(self, key):
+        """Like `get`, but for entries stored with `put_bytes`; returns the encoded bytes."""
+        hit, sha = self._lookup(key)
+        if hit is not None or sha is None:
+            return hit
+        data = self.read_blob(sha)
+        if data is None:
+            return None
+        return self._remember_read(key, sha, data, len)
+
+    def sha_for(self, key):
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                return hit[0]
+            row = self._db.execute("SELECT sha FROM entries WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def read_blob(self, sha):
+        path = self._blob_path(sha)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._forget_blob(sha)
+            return None
+        with self._lock:
+            self._db.execute("UPDATE blobs SET last_access = ? WHERE sha = ?", (time.time(), sha))
+        return data
+
+    # ---------------- inserts ----------------
+    def put(self, key, data):
+        """Store the encoded image `data` under `key` and return it decoded."""
+        sha = git_blob_sha(data)
+        img = _decode(data)
+        with self._lock:
+            self._write_blob(sha, data)
+            self._db.execute("INSERT OR REPLACE INTO entries (key, sha) VALUES (?, ?)", (key, sha))
+            self._remember(key, sha, img, image_nbytes(img))
+            self._evict_disk()
+        return img
+
+    def store(self, key, data):
+        """Store encoded `data` under `key` without decoding it; returns its blob SHA."""
+        sha = git_blob_sha(data)
+        with self._lock:
+            self._write_blob(sha, data)
+            self._db.execute("INSERT OR REPLACE INTO entries (key, sha) VALUES (?, ?)", (key, sha))
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= old[2]
+            self._evict_disk()
+        return sha
+
+    def put_bytes(self, key, data):
+        """Store already-encoded `data` (e.g. a display variant) without decoding it."""
+        sha = git_blob_sha(data)
+        with self._lock:
+            self._write_blob(sha, data)
+            self._db.execute("INSERT OR REPLACE INTO entries (key, sha) VALUES (?, ?)", (key, sha))
+            self._remember(key, sha, data, len(data))
+            self._evict_disk()
+        return data
+
+    # ---------------- internals ----------------
+    def _lookup(self, key):
+        # (value, None) for a memory hit, else (None, SHA on disk or None)
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+                return hit[1], None
+            row = self._db.execute("SELECT sha FROM entries WHERE key = ?", (key,)).fetchone()
+            return None, row[0] if row else None
+
+    def _remember_read(self, key, sha, value, nbytes):
+        with self._lock:
+            # another thread may have loaded or replaced the entry meanwhile
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+                return hit[1]
+            if self.sha_for(key) == sha:
+                self._remember(key, sha, value, nbytes(value))
+        return value
+
+    def _remember(self, key, sha, value, nbytes):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= old[2]
+        if nbytes > self.memory_bytes:
+            return
+        self._memory[key] = (sha, value, nbytes)
+        self._memory_used += nbytes
+        while self._memory_used > self.memory_bytes:
+            _, (_, _, evicted) = self._memory.popitem(last=False)
+            self._memory_used -= evicted
+
+    def _blob_path(self, sha):
+        return os.path.join(self.directory, sha[:2], sha[2:])
+
+    def _write_blob(self, sha, data):
+        if self._db.execute("SELECT 1 FROM blobs WHERE sha = ?", (sha,)).fetchone():
+            return
+        path = self._blob_path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._db.execute(
+            "INSERT INTO blobs (sha, size, last_access) VALUES (?, ?, ?)", (sha, len(data), time.time())
+        )
+        self._disk_used += len(data)
+
+    def _evict_disk(self):
+        if self._disk_used <= self.disk_bytes:
+            return
+        rows = self._db.execute("SELECT sha, size FROM blobs ORDER BY last_access").fetchall()
+        for sha, size in rows:
+            if self._disk_used <= self.disk_bytes:
+                break
+            try:
+                os.remove(self._blob_path(sha))
+            except FileNotFoundError:
+                pass
+            self._forget_blob(sha)
+
+    def _forget_blob(self, sha):
+        row = self._db.execute("SELECT size FROM blobs WHERE sha = ?", (sha,)).fetchone()
+        if row:
+            self._disk_used -= row[0]
+        self._db.execute("DELETE FROM blobs WHERE sha = ?", (sha,))
+        self._db.execute("DELETE FROM entries WHERE sha = ?", (sha,))
+
+
+# ======================================================
+# DISPLAY VARIANTS
+# ======================================================
+def variant_spec(max_width, fmt, quality):
+    return f"w{max_width}.q{quality}.{fmt.lower()}"
+
+
+def render_variant(img, max_width, fmt="WEBP", quality=80):
+    """Downscale `img` to at most `max_width` pixels wide and encode it as `fmt`."""
+    from PIL import Image
+
+    if getattr(img, "is_animated", False):
+        img.seek(0)
+    out = img.copy()
+    if out.width > max_width:
+        out.thumbnail((max_width, max_width * out.height // out.width), Image.LANCZOS)
+
+    fmt = fmt.upper()
+    if fmt == "JPEG" and out.mode not in ("RGB", "L"):
+        out = out.convert("RGB")
+    elif fmt == "WEBP" and out.mode not in ("RGB", "RGBA", "L"):
+        out = out.convert("RGBA" if "A" in out.getbands() or "transparency" in out.info else "RGB")
+
+    buf = io.BytesIO()
+    out.save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+def _decode(data):
+    # Pillow is imported on the first image rather than at start-up
+    from PIL import Image
+
+    with timed("image.decode", bytes=len(data)):
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    return img
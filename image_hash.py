@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from perf import timed
+
+HASH_BITS = 64
+
+
+# ======================================================
+# PERCEPTUAL HASHES
+# ======================================================
+@lru_cache(maxsize=4)
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+
+def _grey(img, size):
+    return np.asarray(img.convert("L").resize(size, Image.LANCZOS), dtype=np.float64)
+
+
+def _pack(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def phash(img, hash_size=8, highfreq_factor=4):
+    """DCT hash: the low-frequency 8x8 corner of a 32x32 greyscale DCT, thresholded at its median."""
+    n = hash_size * highfreq_factor
+    d = _dct_matrix(n)
+    low = (d @ _grey(img, (n, n)) @ d.T)[:hash_size, :hash_size]
+    return _pack(low > np.median(low))
+
+
+def dhash(img, hash_size=8):
+    """Gradient hash: whether each pixel of a 9x8 thumbnail is brighter than its left neighbour."""
+    px = _grey(img, (hash_size + 1, hash_size))
+    return _pack(px[:, 1:] > px[:, :-1])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _signed(h):
+    # SQLite integers are signed 64-bit
+    return h - (1 << HASH_BITS) if h >= 1 << (HASH_BITS - 1) else h
+
+
+def _unsigned(h):
+    return h + (1 << HASH_BITS) if h < 0 else h
+
+
+# ======================================================
+# BK-TREE
+# ======================================================
+class BKTree:
+    """
+    Metric tree over 64-bit hashes under Hamming distance. A radius query
+    only descends into children whose edge distance is within `radius` of
+    the query's distance to the node, so it touches a small part of the tree.
+    """
+
+    def __init__(self):
+        self._root = None     # [hash, set(items), {distance: child}]
+
+    def add(self, h, item):
+        if self._root is None:
+            self._root = [h, {item}, {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].add(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, {item}, {}]
+                return
+            node = child
+
+    def query(self, h, radius):
+        """Items whose hash is within `radius` of `h`, as (distance, item) pairs."""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                found.extend((d, item) for item in node[1])
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return found
+
+
+# ======================================================
+# FINGERPRINT INDEX
+# ======================================================
+class FingerprintIndex:
+    """
+    pHash and dHash of every image seen, keyed by git blob SHA and kept in
+    SQLite so they survive restarts.
+
+    Byte-identical reposts share a blob SHA and are hashed once. Near
+    duplicates (recompressed, resized, re-cropped slightly) are found with a
+    BK-tree over pHash and confirmed with dHash, both within `radius` bits.
+    """
+
+    def __init__(self, path, radius=6):
+        self.radius = radius
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints (sha TEXT PRIMARY KEY, phash INTEGER NOT NULL, dhash INTEGER NOT NULL)"
+        )
+        self._hashes = {}     # sha -> (phash, dhash)
+        self._tree = BKTree()
+        for sha, p, d in self._db.execute("SELECT sha, phash, dhash FROM fingerprints"):
+            self._insert(sha, _unsigned(p), _unsigned(d))
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def has(self, sha):
+        return sha in self._hashes
+
+    def get(self, sha):
+        return self._hashes.get(sha)
+
+    def add(self, sha, img):
+        with timed("image.fingerprint", sha=sha):
+            p, d = phash(img), dhash(img)
+        with self._lock:
+            if sha in self._hashes:
+                return self._hashes[sha]
+            self._db.execute(
+                "INSERT OR REPLACE INTO fingerprints (sha, phash, dhash) VALUES (?, ?, ?)",
+                (sha, _signed(p), _signed(d)),
+            )
+            self._insert(sha, p, d)
+        return p, d
+
+    def near(self, sha, radius=None):
+        """SHAs of other images within `radius` bits of `sha` on both hashes, closest first."""
+        radius = self.radius if radius is None else radius
+        with self._lock:
+            hashes = self._hashes.get(sha)
+            if hashes is None:
+                return []
+            p, d = hashes
+            found = [
+                (dist, other) for dist, other in self._tree.query(p, radius)
+                if other != sha and hamming(d, self._hashes[other][1]) <= radius
+            ]
+        return [other for _, other in sorted(found)]
+
+    def _insert(self, sha, p, d):
+        self._hashes[sha] = (p, d)
+        self._tree.add(p, sha)
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ======================================================
+# IMAGE PREFETCHER
+# ======================================================
+class ImagePrefetcher:
+    """
+    Warms the image loader for the posts an annotator will see next.
+
+    Each session (group) tells the prefetcher which keys it wants ahead of
+    time; keys no longer wanted by any group are cancelled if they have not
+    started yet. Sessions on the same page share in-flight downloads.
+    """
+
+    def __init__(self, fetch, max_workers=4, max_in_flight=8):
+        self.fetch = fetch
+        self.max_in_flight = max_in_flight
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-prefetch")
+        self._lock = threading.Lock()
+        self._futures = {}   # key -> Future
+        self._groups = {}    # group -> list of keys
+
+    def schedule(self, group, keys):
+        keys = list(keys)
+        with self._lock:
+            self._groups[group] = keys
+            self._drop_unwanted()
+
+            in_flight = sum(1 for f in self._futures.values() if not f.done())
+            for key in keys:
+                if in_flight >= self.max_in_flight:
+                    break
+                if key in self._futures:
+                    continue
+                self._futures[key] = self._pool.submit(self._fetch, key)
+                in_flight += 1
+
+    def forget(self, group):
+        with self._lock:
+            self._groups.pop(group, None)
+            self._drop_unwanted()
+
+    def wait(self, key, timeout=None):
+        """Block until an in-flight prefetch of `key` has finished, if there is one."""
+        with self._lock:
+            future = self._futures.get(key)
+        if future is not None and not future.cancelled():
+            try:
+                future.result(timeout)
+            except Exception:
+                # the caller's own load reports the error
+                pass
+
+    def _fetch(self, key):
+        # the loader caches the result; holding it here would only pin memory
+        self.fetch(*key)
+
+    def _drop_unwanted(self):
+        wanted = {k for keys in self._groups.values() for k in keys}
+        for key in [k for k in self._futures if k not in wanted]:
+            future = self._futures.pop(key)
+            future.cancel()
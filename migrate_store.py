@@ -0,0 +1,80 @@
+"""
+One-shot copy of annotations between the Google Sheet and a local SQLite store.
+
+    python migrate_store.py sheets-to-sqlite --db annotations.db
+    python migrate_store.py sqlite-to-sheets --db annotations.db
+
+Rows already present in the target (same page_name, post_id, annotator and
+timestamp) are skipped, so the command can be re-run to sync. Pass
+`--sharded` to read or write the per-page worksheets instead of sheet1.
+
+Maintenance of the per-page worksheets ("sheets-sharded" backend):
+
+    python migrate_store.py split-sheet             # sheet1 -> one worksheet per page
+    python migrate_store.py compact [PAGE ...]      # drop repeated labels (all pages by default)
+    python migrate_store.py archive PAGE [PAGE ...] # compact closed pages, then rename and hide them
+"""
+import argparse
+import tomllib
+
+from annotation_store import (
+    SheetsStore, ShardedSheetsStore, SQLiteStore,
+    open_spreadsheet, split_sheet, sync_stores,
+)
+
+SECRETS_PATH = ".streamlit/secrets.toml"
+SHEET_NAME = "annotation_db"
+
+
+def shard_pages(sharded):
+    rows, _ = sharded.read_since(None)
+    return sorted({r[0] for r in rows if r[0]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "command",
+        choices=["sheets-to-sqlite", "sqlite-to-sheets", "split-sheet", "compact", "archive"],
+    )
+    parser.add_argument("pages", nargs="*", help="page names for compact / archive")
+    parser.add_argument("--db", default="annotations.db", help="SQLite database path")
+    parser.add_argument("--sheet", default=SHEET_NAME, help="Google spreadsheet name")
+    parser.add_argument("--sharded", action="store_true", help="use the per-page worksheets")
+    parser.add_argument("--secrets", default=SECRETS_PATH, help="Streamlit secrets file with gcp_service_account")
+    args = parser.parse_args()
+
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+
+    spreadsheet = open_spreadsheet(secrets["gcp_service_account"], args.sheet)
+    sharded = ShardedSheetsStore(spreadsheet)
+
+    if args.command == "split-sheet":
+        for page_name, copied in split_sheet(SheetsStore(spreadsheet.sheet1), sharded).items():
+            print(f"{page_name}: copied {copied} rows")
+        return
+
+    if args.command in ("compact", "archive"):
+        if args.command == "archive" and not args.pages:
+            parser.error("archive needs the page names of closed pages")
+        for page_name in args.pages or shard_pages(sharded):
+            if args.command == "archive":
+                removed = sharded.archive(page_name)
+                print(f"{page_name}: removed {removed} repeated rows, archived")
+            else:
+                print(f"{page_name}: removed {sharded.compact(page_name)} repeated rows")
+        return
+
+    sheets = sharded if args.sharded else SheetsStore(spreadsheet.sheet1)
+    sqlite = SQLiteStore(args.db)
+
+    if args.command == "sheets-to-sqlite":
+        copied = sync_stores(sheets, sqlite)
+    else:
+        copied = sync_stores(sqlite, sheets)
+    print(f"{args.command}: copied {copied} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import importlib.util
+import json
+import threading
+from functools import lru_cache
+
+# the only fields of facebook_posts.jsonl the app reads
+POST_COLUMNS = ["post_id", "post_text", "post_url", "image_file"]
+
+
+@lru_cache(maxsize=1)
+def string_dtype():
+    # only looked up, not imported: pandas loads pyarrow on first use, off the cold-start path
+    return "string[pyarrow]" if importlib.util.find_spec("pyarrow") is not None else "string"
+
+
+# ======================================================
+# STREAMING PAGE LOADER
+# ======================================================
+class PagePosts:
+    """
+    Posts of one page, parsed line by line as the JSONL file streams in.
+
+    Only POST_COLUMNS are kept. Readers can ask for the next unannotated
+    posts while parsing is still running; `frame()` builds the compact
+    DataFrame once everything has been read and drops the per-column lists,
+    after which rows are served from the frame.
+    """
+
+    def __init__(self):
+        self._columns = {c: [] for c in POST_COLUMNS}     # None once the frame is built
+        self._total = 0
+        self._offsets = {}          # post_id -> row offset
+        self._cond = threading.Condition()
+        self._complete = False
+        self._error = None
+        self._frame = None
+        self._by_image = None       # image_file -> [post_id], built on first use
+
+    # ---------------- producer ----------------
+    def feed(self, lines):
+        try:
+            for line in lines:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                with self._cond:
+                    self._append(record)
+                    self._cond.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._cond:
+                self._complete = True
+                self._cond.notify_all()
+
+    def load_in_background(self, lines):
+        threading.Thread(target=self.feed, args=(lines,), name="page-loader", daemon=True).start()
+        return self
+
+    def _append(self, record):
+        post_id = str(record.get("post_id"))
+        if post_id in self._offsets:
+            return
+        self._offsets[post_id] = self._total
+        self._columns["post_id"].append(post_id)
+        for c in POST_COLUMNS[1:]:
+            self._columns[c].append(record.get(c))
+        self._total += 1
+
+    # ---------------- readers ----------------
+    @property
+    def complete(self):
+        return self._complete
+
+    @property
+    def failed(self):
+        """Parsing stopped on an error (e.g. the download was cut off); the posts are incomplete."""
+        return self._complete and self._error is not None
+
+    @property
+    def total(self):
+        return self._total
+
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._complete)
+        self._raise_if_failed()
+
+    def offset(self, post_id):
+        return self._offsets.get(str(post_id))
+
+    def row(self, post_id):
+        return self._row_at(self._offsets[str(post_id)])
+
+    def posts_with_image(self, image_file):
+        """Ids of the posts that use `image_file`; waits for the whole page."""
+        data = self.frame()
+        if self._by_image is None:
+            by_image = {}
+            for post_id, name in zip(data["post_id"].tolist(), data["image_file"].tolist()):
+                by_image.setdefault(name, []).append(post_id)
+            self._by_image = by_image
+        return self._by_image.get(image_file, [])
+
+    def _row_at(self, i):
+        columns = self._columns
+        if columns is not None:
+            return {c: columns[c][i] for c in POST_COLUMNS}
+        import pandas as pd
+
+        row = {c: self._frame[c].iat[i] for c in POST_COLUMNS}
+        return {c: None if pd.isna(v) else str(v) for c, v in row.items()}
+
+    def upcoming(self, done_ids, n):
+        """Return up to `n` posts not in `done_ids`, waiting only as long as needed to find them."""
+        if self._complete:
+            self._raise_if_failed()
+            data = self.frame()
+            positions = data.index[~data["post_id"].isin(done_ids)][:n]
+            return [self._row_at(i) for i in positions]
+
+        found = []
+        i = 0
+        with self._cond:
+            while len(found) < n:
+                self._cond.wait_for(lambda: self._complete or i < self._total)
+                if i >= self._total or self._columns is None:
+                    break
+                post_id = self._columns["post_id"][i]
+                if post_id not in done_ids:
+                    found.append(self._row_at(i))
+                i += 1
+            compacted = self._columns is None and i < self._total
+        self._raise_if_failed()
+        if compacted and len(found) < n:
+            # another reader built the frame meanwhile; the rest comes from there
+            found += self.upcoming(done_ids | {p["post_id"] for p in found}, n - len(found))
+        return found
+
+    def frame(self):
+        self.wait()
+        with self._cond:
+            if self._frame is None:
+                import pandas as pd
+
+                df = pd.DataFrame(self._columns)
+                for c in POST_COLUMNS:
+                    df[c] = df[c].astype(string_dtype())
+                self._frame = df
+                self._columns = None
+        return self._frame
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
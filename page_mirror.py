@@ -0,0 +1,143 @@
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from github_client import RepoManifest
+from perf import timed
+
+
+# ======================================================
+# LOCAL PAGE MIRROR
+# ======================================================
+class PageMirror:
+    """
+    Local copy of whole page directories for offline annotation.
+
+    `sync_page` downloads every file under a page with bounded concurrency,
+    skipping files whose blob SHA already matches the manifest, and removes
+    files that disappeared upstream. The manifest used for the last sync is
+    kept, so pages and images stay available when GitHub is unreachable.
+    Files are read back through memory maps.
+    """
+
+    def __init__(self, client, root=".mirror", max_workers=8):
+        self.client = client
+        self.root = os.path.join(root, client.owner, client.repo)
+        self.max_workers = max_workers
+
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, "mirror.db"),
+                                   check_same_thread=False, isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, sha TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS pages (page TEXT PRIMARY KEY)")
+        self._shas = dict(self._db.execute("SELECT path, sha FROM files").fetchall())
+        self._pages = {p for (p,) in self._db.execute("SELECT page FROM pages").fetchall()}
+
+    # ---------------- sync ----------------
+    def sync_page(self, page_name, manifest, progress=None):
+        """
+        Bring `page_name` up to date with `manifest`. `progress(done, total)`
+        is called as files complete. Returns counts of downloaded, unchanged
+        and removed files.
+
+        A truncated manifest may be missing part of the page, so the page's
+        own tree is fetched instead, and the saved snapshot keeps the complete
+        listing of every page synced so far.
+        """
+        prefix = f"{page_name}/"
+        if manifest.truncated:
+            snapshot = self.manifest()
+            with self._lock:
+                synced = self._pages - {page_name}
+            subtrees = {p: snapshot for p in synced} if snapshot is not None else {}
+            subtrees[page_name] = self.client.subtree(page_name)
+            manifest = manifest.with_subtrees(subtrees)
+        wanted = {p: sha for p, (sha, _) in manifest.blobs.items() if p.startswith(prefix)}
+        with self._lock:
+            stale = [p for p, sha in wanted.items() if self._shas.get(p) != sha or not os.path.exists(self._local(p))]
+            gone = [p for p in self._shas if p.startswith(prefix) and p not in wanted]
+
+        with timed("mirror.sync", page=page_name, files=len(stale)):
+            done = 0
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mirror-sync") as pool:
+                for path in pool.map(self._download, stale, [wanted[p] for p in stale]):
+                    done += 1
+                    if progress:
+                        progress(done, len(stale))
+
+        for path in gone:
+            try:
+                os.remove(self._local(path))
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            for path in gone:
+                self._shas.pop(path, None)
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in gone])
+            self._db.execute("INSERT OR IGNORE INTO pages (page) VALUES (?)", (page_name,))
+            self._db.execute("COMMIT")
+            self._pages.add(page_name)
+        self._save_manifest(manifest)
+        return {"downloaded": len(stale), "unchanged": len(wanted) - len(stale), "removed": len(gone)}
+
+    def _download(self, path, sha):
+        data = self.client.blob(path, sha)
+        local = self._local(path)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        tmp = f"{local}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, local)
+        with self._lock:
+            self._shas[path] = sha
+            self._db.execute("INSERT OR REPLACE INTO files (path, sha) VALUES (?, ?)", (path, sha))
+        return path
+
+    # ---------------- reads ----------------
+    def has_page(self, page_name):
+        return page_name in self._pages
+
+    def has(self, path, sha=None):
+        """Whether `path` is mirrored (and, if `sha` is given, at that version)."""
+        with self._lock:
+            local_sha = self._shas.get(path)
+        return local_sha is not None and (sha is None or sha == local_sha) and os.path.exists(self._local(path))
+
+    def read_bytes(self, path):
+        with open(self._local(path), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:]
+
+    def iter_lines(self, path):
+        """Lines of a mirrored file, read from a memory map rather than loaded whole."""
+        with open(self._local(path), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from iter(mm.readline, b"")
+
+    # ---------------- manifest snapshot ----------------
+    def manifest(self):
+        """The manifest saved by the last sync, or None."""
+        try:
+            with open(os.path.join(self.root, "manifest.json"), encoding="utf-8") as f:
+                return RepoManifest(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def _save_manifest(self, manifest):
+        path = os.path.join(self.root, "manifest.json")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest.to_tree(), f)
+        os.replace(tmp, path)
+
+    def _local(self, path):
+        return os.path.join(self.root, *path.split("/"))
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+# ======================================================
+# PER-RERUN TIMINGS
+# ======================================================
+class Rerun:
+    """Timings recorded on the script thread during one rerun of one session."""
+
+    def __init__(self, session_id, annotator):
+        self.session_id = session_id
+        self.annotator = annotator
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.last_activity = self.started
+        self.records = []
+
+
+def begin_rerun(session_id, annotator):
+    rerun = Rerun(session_id, annotator)
+    _local.rerun = rerun
+    return rerun
+
+
+def finish_rerun(rerun):
+    """
+    Summarise a rerun. Streamlit reruns can end in `st.stop()`/`st.rerun()`,
+    so this is called at the start of the session's next rerun and the
+    duration runs until the last recorded activity.
+    """
+    if getattr(_local, "rerun", None) is rerun:
+        _local.rerun = None
+    total_ms = (rerun.last_activity - rerun.started) * 1000
+    registry.observe_rerun(total_ms)
+    return {
+        "ts": rerun.started_at,
+        "session_id": rerun.session_id,
+        "annotator": rerun.annotator,
+        "total_ms": round(total_ms, 2),
+        "ops": rerun.records,
+    }
+
+
+@contextmanager
+def timed(name, **fields):
+    """
+    Time a block. Callers can add `bytes`, `cache` ("hit"/"miss") or any other
+    field to the yielded record. Work on background threads only reaches the
+    process-wide counters, not a rerun.
+    """
+    record = {"op": name, **fields}
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        record["ms"] = round((end - start) * 1000, 2)
+        rerun = getattr(_local, "rerun", None)
+        if rerun is not None:
+            rerun.records.append(record)
+            rerun.last_activity = end
+        registry.observe(record)
+
+
+# ======================================================
+# PROCESS-WIDE COUNTERS
+# ======================================================
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}          # op -> [count, seconds, bytes, errors]
+        self._cache = {}        # (op, result) -> count
+        self._gauges = {}       # name -> value
+        self._reruns = [0, 0.0]
+
+    def observe(self, record):
+        with self._lock:
+            stats = self._ops.setdefault(record["op"], [0, 0.0, 0, 0])
+            stats[0] += 1
+            stats[1] += record["ms"] / 1000
+            stats[2] += record.get("bytes") or 0
+            stats[3] += 1 if "error" in record else 0
+            if record.get("cache"):
+                key = (record["op"], record["cache"])
+                self._cache[key] = self._cache.get(key, 0) + 1
+            if record.get("ratelimit_remaining") is not None:
+                self._gauges["github_ratelimit_remaining"] = record["ratelimit_remaining"]
+
+    def observe_rerun(self, total_ms):
+        with self._lock:
+            self._reruns[0] += 1
+            self._reruns[1] += total_ms / 1000
+
+    def prometheus_text(self):
+        with self._lock:
+            lines = [
+                "# TYPE annotation_app_op_seconds summary",
+            ]
+            for op, (count, seconds, _, _) in sorted(self._ops.items()):
+                lines.append(f'annotation_app_op_seconds_count{{op="{op}"}} {count}')
+                lines.append(f'annotation_app_op_seconds_sum{{op="{op}"}} {seconds:.6f}')
+            lines.append("# TYPE annotation_app_op_bytes_total counter")
+            for op, (_, _, nbytes, _) in sorted(self._ops.items()):
+                lines.append(f'annotation_app_op_bytes_total{{op="{op}"}} {nbytes}')
+            lines.append("# TYPE annotation_app_op_errors_total counter")
+            for op, (_, _, _, errors) in sorted(self._ops.items()):
+                lines.append(f'annotation_app_op_errors_total{{op="{op}"}} {errors}')
+            lines.append("# TYPE annotation_app_cache_total counter")
+            for (op, result), count in sorted(self._cache.items()):
+                lines.append(f'annotation_app_cache_total{{op="{op}",result="{result}"}} {count}')
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f"# TYPE annotation_app_{name} gauge")
+                lines.append(f"annotation_app_{name} {value}")
+            lines.append("# TYPE annotation_app_rerun_seconds summary")
+            lines.append(f"annotation_app_rerun_seconds_count {self._reruns[0]}")
+            lines.append(f"annotation_app_rerun_seconds_sum {self._reruns[1]:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ======================================================
+# EXPORT
+# ======================================================
+_log_lock = threading.Lock()
+
+
+def export(summary, log_path=None, prom_path=None, max_log_bytes=None):
+    """
+    Append `summary` to a JSON-lines log and rewrite the Prometheus text file.
+    Once the log exceeds `max_log_bytes` it is moved to `<log_path>.1`
+    (replacing the previous one), so at most two logs' worth is kept.
+    """
+    if log_path:
+        with _log_lock:
+            try:
+                if max_log_bytes and os.path.getsize(log_path) >= max_log_bytes:
+                    os.replace(log_path, f"{log_path}.1")
+            except FileNotFoundError:
+                pass
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary) + "\n")
+    if prom_path:
+        tmp = f"{prom_path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(registry.prometheus_text())
+        os.replace(tmp, prom_path)
@@ -0,0 +1,132 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from perf import timed
+
+log = logging.getLogger(__name__)
+
+STATS_COLUMNS = ["page_name", "post_id", "annotator", "timestamp"]
+
+
+# ======================================================
+# POST COUNTS
+# ======================================================
+class PostCounts:
+    """
+    Number of posts on every page, counted from each facebook_posts.jsonl on
+    a bounded thread pool. Counts are kept per blob SHA, so a refresh only
+    recounts the pages whose file changed since the last one.
+    """
+
+    def __init__(self, read_lines, max_workers=8):
+        self.read_lines = read_lines      # (path, sha) -> iterable of JSONL lines
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._counts = {}                 # page_name -> (sha, count)
+
+    def refresh(self, files):
+        """
+        `files` maps page names to the (path, sha) of their post file.
+        Returns {page_name: count} for the pages that could be counted.
+        """
+        with self._lock:
+            stale = {
+                page: f for page, f in files.items()
+                if f[1] is not None and self._counts.get(page, (None,))[0] != f[1]
+            }
+        if stale:
+            with timed("dashboard.count_posts", pages=len(stale)), \
+                    ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="post-counts") as pool:
+                for page, count in zip(stale, pool.map(self._count, stale.values())):
+                    if count is not None:
+                        with self._lock:
+                            self._counts[page] = (stale[page][1], count)
+        with self._lock:
+            return {page: self._counts[page][1] for page in files if page in self._counts}
+
+    def _count(self, file):
+        # the same post_id twice is one post, as in PagePosts
+        try:
+            ids = {str(json.loads(line).get("post_id")) for line in self.read_lines(*file) if line.strip()}
+        except (OSError, ValueError) as e:
+            log.warning("could not count posts in %s: %r", file[0], e)
+            return None
+        return len(ids)
+
+
+# ======================================================
+# ANNOTATION STATS
+# ======================================================
+class AnnotationStats:
+    """
+    Who labelled which post and when, for every page.
+
+    Rows are pulled from the store incrementally, like AnnotationIndex does,
+    and kept as one small DataFrame; the page and annotator summaries are
+    single groupby aggregations over it, recomputed only after new rows.
+    """
+
+    def __init__(self, store, refresh_interval=30.0):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._cursor = None
+        self._last_refresh = 0.0
+        self._frame = pd.DataFrame({
+            c: pd.Series(dtype="datetime64[ns]" if c == "timestamp" else object) for c in STATS_COLUMNS
+        })
+        self._summaries = {}
+
+    def refresh(self, force=False):
+        """Pull new rows; returns False when throttled by `refresh_interval`."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._cursor is not None and now - self._last_refresh < self.refresh_interval:
+                return False
+            rows, self._cursor = self.store.read_since(self._cursor)
+            self._last_refresh = now
+            if rows:
+                new = pd.DataFrame([[str(v) for v in r[:3]] + [r[-1]] for r in rows], columns=STATS_COLUMNS)
+                new["timestamp"] = pd.to_datetime(new["timestamp"], format="ISO8601", errors="coerce")
+                # a resubmission (or a re-read after compaction) replaces the earlier row
+                self._frame = pd.concat([self._frame, new], ignore_index=True).drop_duplicates(
+                    subset=STATS_COLUMNS[:3], keep="last"
+                )
+                self._summaries = {}
+            return True
+
+    def by_page(self):
+        """Annotated posts, labels and annotators per page."""
+        with self._lock:
+            if "page" not in self._summaries:
+                self._summaries["page"] = self._frame.groupby("page_name").agg(
+                    annotated=("post_id", "nunique"),
+                    labels=("post_id", "size"),
+                    annotators=("annotator", "nunique"),
+                    last_label=("timestamp", "max"),
+                )
+            return self._summaries["page"]
+
+    def by_annotator(self):
+        """
+        Labels, pages and labelling rate per annotator. The rate is labels
+        per active hour (clock hours with at least one label), so breaks
+        between sessions do not count against it.
+        """
+        with self._lock:
+            if "annotator" not in self._summaries:
+                frame = self._frame.assign(hour=self._frame["timestamp"].dt.floor("h"))
+                summary = frame.groupby("annotator").agg(
+                    labels=("post_id", "size"),
+                    pages=("page_name", "nunique"),
+                    active_hours=("hour", "nunique"),
+                    last_label=("timestamp", "max"),
+                )
+                summary["labels_per_hour"] = summary["labels"] / summary["active_hours"].where(summary["active_hours"] > 0)
+                self._summaries["annotator"] = summary.sort_values("labels", ascending=False)
+            return self._summaries["annotator"]
@@ -0,0 +1,386 @@
+import hashlib
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import unquote, urlsplit
+
+from perf import timed
+
+
+class SharedCacheError(Exception):
+    """The shared cache could not be reached or answered with an error."""
+
+
+# ======================================================
+# SHARED CACHE INTERFACE
+# ======================================================
+class SharedCache:
+    """
+    Byte values shared by every replica of the app, with single-flight fills.
+
+    Backends implement `get`, `set`, `acquire`, `release` and `locked`.
+    `get_or_fetch` takes a short lease on a missing key before fetching it;
+    other replicas that miss the same key meanwhile wait for that value
+    instead of fetching it too, and only fetch themselves if the lease
+    holder gives up or takes longer than `wait` seconds.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def acquire(self, key, lease):
+        """Try to take the fill lock for `key`; returns a token, or None if another holder has it."""
+        raise NotImplementedError
+
+    def release(self, key, token):
+        raise NotImplementedError
+
+    def locked(self, key):
+        raise NotImplementedError
+
+    def get_or_fetch(self, key, fetch, ttl=None, wait=30.0):
+        with timed("shared.get", key=key) as rec:
+            token = None
+            try:
+                value = self.get(key)
+                rec["cache"] = "hit"
+                if value is None:
+                    token = self.acquire(key, lease=wait)
+                    if token is None:
+                        value = self._wait_for(key, wait)
+                        rec["cache"] = "waited"
+            except SharedCacheError:
+                # an unreachable cache must not take the app down with it
+                value = None
+                rec["cache"] = "unavailable"
+
+            # from here on a lease we took is always given back, even when
+            # another holder turns out to have filled the key already
+            try:
+                if token is not None:
+                    try:
+                        value = self.get(key)
+                    except SharedCacheError:
+                        rec["cache"] = "unavailable"
+                if value is not None:
+                    rec["bytes"] = len(value)
+                    return value
+
+                value = fetch()
+                if rec["cache"] != "unavailable":
+                    rec["cache"] = "miss"
+                    try:
+                        self.set(key, value, ttl)
+                    except SharedCacheError:
+                        pass
+                rec["bytes"] = len(value)
+                return value
+            finally:
+                if token is not None:
+                    try:
+                        self.release(key, token)
+                    except SharedCacheError:
+                        pass
+
+    def _wait_for(self, key, wait):
+        deadline = time.monotonic() + wait
+        delay = 0.05
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            value = self.get(key)
+            if value is not None:
+                return value
+            if not self.locked(key):
+                # the holder failed; one more look in case it finished just now
+                return self.get(key)
+        return None
+
+
+def open_shared_cache(url):
+    """
+    `""` (no sharing), `redis://[:password@]host[:port][/db]` (`rediss://`
+    for TLS), or a directory path / `file://` URL.
+    """
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://")):
+        return RedisSharedCache(url)
+    if url.startswith("file://"):
+        url = unquote(urlsplit(url).path)
+    return FileSharedCache(url)
+
+
+# ======================================================
+# FILESYSTEM BACKEND
+# ======================================================
+class FileSharedCache(SharedCache):
+    """
+    Values as files under a directory all replicas mount (NFS, EFS, a
+    shared volume). Each file starts with its expiry time; writes go through
+    a temporary file and an atomic rename. Fill locks are files created with
+    O_EXCL that carry their own expiry, so a crashed holder's lock goes stale.
+    Filesystem errors (a stale NFS handle, a full or unmounted volume) are
+    raised as SharedCacheError, so `get_or_fetch` falls back to fetching.
+    """
+
+    _HEADER = struct.Struct(">d")     # expiry as a unix time, 0 for none
+    SWEEP_EVERY = 200                 # sets between sweeps of expired files
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._sets = 0
+
+    def _path(self, key):
+        h = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.directory, h[:2], h[2:])
+
+    @contextmanager
+    def _reachable(self):
+        try:
+            yield
+        except OSError as e:
+            raise SharedCacheError(f"{self.directory}: {e}") from e
+
+    def get(self, key):
+        path = self._path(key)
+        with self._reachable():
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            (expiry,) = self._HEADER.unpack_from(data)
+            if expiry and expiry < time.time():
+                self._remove(path)
+                return None
+        return data[self._HEADER.size:]
+
+    def set(self, key, value, ttl=None):
+        path = self._path(key)
+        with self._reachable():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(self._HEADER.pack(time.time() + ttl if ttl else 0.0))
+                f.write(value)
+            os.replace(tmp, path)
+
+            self._sets += 1
+            if self._sets % self.SWEEP_EVERY == 0:
+                self.sweep()
+
+    def acquire(self, key, lease):
+        path = self._path(key) + ".lock"
+        token = uuid.uuid4().hex
+        with self._reachable():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            for _ in range(2):
+                try:
+                    fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    if self._lock_alive(path):
+                        return None
+                    # a crashed holder's lock: clear it and try once more
+                    self._remove(path)
+                    continue
+                with os.fdopen(fd, "w") as f:
+                    f.write(f"{token} {time.time() + lease}")
+                return token
+        return None
+
+    def release(self, key, token):
+        path = self._path(key) + ".lock"
+        with self._reachable():
+            try:
+                with open(path) as f:
+                    held = f.read().split(" ")[0]
+            except FileNotFoundError:
+                return
+            if held == token:
+                self._remove(path)
+
+    def locked(self, key):
+        with self._reachable():
+            return self._lock_alive(self._path(key) + ".lock")
+
+    def _lock_alive(self, path):
+        try:
+            with open(path) as f:
+                _, expiry = f.read().split(" ")
+            return float(expiry) > time.time()
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            # being written right now
+            return True
+
+    def sweep(self):
+        """Delete expired values from the directory."""
+        now = time.time()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith((".lock", ".tmp")):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    with open(path, "rb") as f:
+                        (expiry,) = self._HEADER.unpack(f.read(self._HEADER.size))
+                except (OSError, struct.error):
+                    continue
+                if expiry and expiry < now:
+                    self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# ======================================================
+# REDIS BACKEND
+# ======================================================
+class RedisError(SharedCacheError):
+    pass
+
+
+class RedisSharedCache(SharedCache):
+    """
+    Values in Redis (or anything speaking RESP, e.g. Valkey, KeyDB, a local
+    stand-in), through a minimal client: one connection per thread and only
+    GET, SET (with NX/PX), DEL, AUTH and SELECT. Fill locks are
+    `SET lock NX PX` keys that expire by themselves. A `rediss://` URL
+    connects over TLS, verifying the server certificate.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="nepali-memes:", timeout=5.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.strip("/") or 0)
+        self.tls = parts.scheme == "rediss"
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    # ---------------- cache operations ----------------
+    def get(self, key):
+        return self.execute("GET", self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.execute("SET", self.prefix + key, value, "PX", int(ttl * 1000))
+        else:
+            self.execute("SET", self.prefix + key, value)
+
+    def acquire(self, key, lease):
+        token = uuid.uuid4().hex
+        ok = self.execute("SET", self.prefix + key + ":lock", token, "NX", "PX", int(lease * 1000))
+        return token if ok == b"OK" else None
+
+    def release(self, key, token):
+        # not atomic, but the lock only deduplicates fetches: if it expired
+        # and was retaken in between, the worst case is one extra fetch
+        lock = self.prefix + key + ":lock"
+        if self.execute("GET", lock) == token.encode():
+            self.execute("DEL", lock)
+
+    def locked(self, key):
+        return self.execute("GET", self.prefix + key + ":lock") is not None
+
+    # ---------------- protocol ----------------
+    def execute(self, *args):
+        """Send one command; reconnects once if the connection was dropped."""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn[0].sendall(_encode_command(args))
+                return _read_reply(conn[1])
+            except OSError as e:
+                self._close()
+                if attempt:
+                    raise RedisError(f"{self.host}:{self.port}: {e}") from e
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                if self.tls:
+                    sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+            except OSError as e:
+                raise RedisError(f"{self.host}:{self.port}: {e}") from e
+            conn = (sock, sock.makefile("rb"))
+            # kept only once AUTH and SELECT went through, so a failed
+            # handshake is retried on a fresh connection next time
+            try:
+                if self.password:
+                    conn[0].sendall(_encode_command(("AUTH", self.password)))
+                    _read_reply(conn[1])
+                if self.db:
+                    conn[0].sendall(_encode_command(("SELECT", self.db)))
+                    _read_reply(conn[1])
+            except (OSError, RedisError) as e:
+                conn[1].close()
+                sock.close()
+                if isinstance(e, RedisError):
+                    raise
+                raise RedisError(f"{self.host}:{self.port}: {e}") from e
+            self._local.conn = conn
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+
+def _encode_command(args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def _read_reply(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionResetError("connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest
+    if kind == b"-":
+        raise RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        n = int(rest)
+        if n < 0:
+            return None
+        data = f.read(n + 2)
+        return data[:-2]
+    if kind == b"*":
+        n = int(rest)
+        return None if n < 0 else [_read_reply(f) for _ in range(n)]
+    raise RedisError(f"unexpected reply {line!r}")
@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from perf import timed
+
+log = logging.getLogger(__name__)
+
+
+def current_release():
+    """APP_RELEASE if set, else the checked-out git commit, else ""."""
+    release = os.environ.get("APP_RELEASE")
+    if release:
+        return release
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+# ======================================================
+# COLD START
+# ======================================================
+class Startup:
+    """
+    Work done once per process to get the first annotator going sooner.
+
+    Warm-up steps (opening the sheet, listing folders, loading the last
+    page, ...) run in order on a background thread while the first visitor
+    is still on the login page. Each step and a few milestones of the first
+    session are timed; once both are known the breakdown is appended to
+    `log_path` as one JSON line, tagged with the release, so cold starts
+    can be compared between deploys.
+    """
+
+    def __init__(self, imports_ms=None, log_path=None, release=None):
+        self.log_path = log_path
+        self.release = current_release() if release is None else release
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.steps = []               # [{"step", "ms", "error"?}]
+        self.marks = {}               # milestone -> ms since the process' first script run
+        if imports_ms is not None:
+            self.marks["script_imports"] = round(imports_ms, 2)
+        self._thread = None
+        self._warmed = threading.Event()
+        self._written = False
+
+    # ---------------- warm-up ----------------
+    def warm_up(self, steps):
+        """Run `steps`, a list of (name, callable), on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(steps,), name="startup-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self, steps):
+        for name, step in steps:
+            entry = {"step": name}
+            try:
+                with timed(f"startup.{name}") as rec:
+                    step()
+            except Exception as e:
+                # a failed step is just not warm; the session does it again itself
+                log.warning("warm-up step %s failed: %r", name, e)
+            entry["ms"] = rec["ms"]
+            if "error" in rec:
+                entry["error"] = rec["error"]
+            with self._lock:
+                self.steps.append(entry)
+        self.mark("warm")
+        self._warmed.set()
+        self._maybe_write()
+
+    def wait(self, timeout=None):
+        return self._warmed.wait(timeout)
+
+    # ---------------- milestones ----------------
+    def mark(self, name):
+        """Record the first time `name` is reached (later calls are ignored)."""
+        with self._lock:
+            if name not in self.marks:
+                self.marks[name] = round((time.perf_counter() - self._started) * 1000, 2)
+                return True
+            return False
+
+    def first_page(self):
+        """The first session has its first post on screen."""
+        if self.mark("first_page"):
+            self._maybe_write()
+
+    # ---------------- breakdown ----------------
+    def breakdown(self):
+        with self._lock:
+            return {
+                "ts": self.started_at,
+                "release": self.release,
+                "pid": os.getpid(),
+                "marks": dict(self.marks),
+                "steps": list(self.steps),
+            }
+
+    def _maybe_write(self):
+        # once per process, when both the warm-up and the first page are done
+        with self._lock:
+            if self._written or "warm" not in self.marks or "first_page" not in self.marks:
+                return
+            self._written = True
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.breakdown()) + "\n")
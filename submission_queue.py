@@ -0,0 +1,241 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from annotation_store import _row_key
+
+log = logging.getLogger(__name__)
+
+JOURNAL_PATH = "annotation_journal.db"
+
+# how far back from the end of the store to look for rows of an in-flight batch
+RECONCILE_WINDOW = 500
+
+
+# ======================================================
+# SUBMISSION QUEUE
+# ======================================================
+class SubmissionQueue:
+    """
+    Write-behind queue between the annotation form and a remote store.
+
+    `submit()` only writes the row to a local SQLite journal and returns.
+    A background worker flushes journalled rows to the store in batches with
+    `append_rows`: after the first row arrives it keeps collecting for
+    `flush_interval` seconds (or until `batch_size` rows are pending), so
+    rows submitted close together cost one API call. Rows are marked
+    in-flight before each append so that, after a crash, a batch that may
+    already have reached the store is reconciled against the store's tail
+    instead of being appended twice.
+
+    Rows the store rejects outright (a 4xx other than a quota error, or
+    row data it cannot take) are
+    retried on their own, so one bad row cannot hold back the rest; after
+    `max_attempts` such failures a row is moved to the `failed` table.
+    """
+
+    def __init__(self, store, path=JOURNAL_PATH, batch_size=50, flush_interval=2.0,
+                 max_backoff=120.0, max_attempts=5):
+        self.store = store
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pending (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                row TEXT NOT NULL,
+                in_flight INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # journals written before attempts were counted
+        columns = [c[1] for c in self._conn.execute("PRAGMA table_info(pending)")]
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE pending ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS failed (
+                id INTEGER PRIMARY KEY,
+                row TEXT NOT NULL,
+                error TEXT NOT NULL
+            )
+            """
+        )
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = None
+
+    # ---------------- producer side ----------------
+    def submit(self, row):
+        self.submit_many([row])
+
+    def submit_many(self, rows):
+        """Journal `rows` in one transaction, so the worker appends them together."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO pending (row) VALUES (?)", [(json.dumps(r),) for r in rows])
+            self._conn.execute("COMMIT")
+        self._wakeup.set()
+
+    def pending_rows(self):
+        with self._lock:
+            cur = self._conn.execute("SELECT row FROM pending ORDER BY id")
+            return [json.loads(r) for (r,) in cur.fetchall()]
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def failed_count(self):
+        """Rows set aside after `max_attempts` rejections; they stay in the journal for inspection."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM failed").fetchone()[0]
+
+    # ---------------- worker ----------------
+    def start(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="submission-queue", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self, flush=True):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        if flush:
+            while self.flush_once():
+                pass
+
+    def _run(self):
+        backoff = self.flush_interval
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._collect()
+            if self._stopped.is_set():
+                # stop() flushes whatever is left itself
+                break
+            try:
+                while self.flush_once():
+                    pass
+                backoff = self.flush_interval
+            except Exception as e:
+                if _is_retryable(e):
+                    log.warning("flush failed, retrying: %r", e)
+                else:
+                    log.error("flush failed: %r", e, exc_info=e)
+                # exponential backoff with jitter; quota windows are per minute
+                backoff = min(self.max_backoff, backoff * 2)
+                self._stopped.wait(backoff * (0.5 + random.random() / 2))
+
+    def _collect(self):
+        # rows submitted within `flush_interval` of the first one go out in
+        # one append, unless a full batch is waiting before then
+        if not self.pending_count():
+            return
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stopped.is_set() and self.pending_count() < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._wakeup.wait(remaining)
+            self._wakeup.clear()
+
+    def flush_once(self):
+        """Append one batch to the store. Returns the number of rows flushed."""
+        self._reconcile_in_flight()
+
+        with self._lock:
+            batch = self._conn.execute(
+                "SELECT id, row, attempts FROM pending ORDER BY id LIMIT ?", (self.batch_size,)
+            ).fetchall()
+            if not batch:
+                return 0
+            if batch[0][2]:
+                # rejected before: try it alone, so a bad row only fails itself
+                batch = batch[:1]
+            ids = [i for i, _, _ in batch]
+            self._conn.execute(
+                f"UPDATE pending SET in_flight = 1 WHERE id IN ({','.join('?' * len(ids))})", ids
+            )
+
+        try:
+            self.store.append_rows([json.loads(r) for _, r, _ in batch])
+        except Exception as e:
+            if _is_rejection(e):
+                self._count_failure(ids, e)
+            raise
+
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM pending WHERE id IN ({','.join('?' * len(ids))})", ids
+            )
+        return len(ids)
+
+    def _count_failure(self, ids, error):
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            # a rejected append wrote nothing, so there is nothing to reconcile
+            self._conn.execute(
+                f"UPDATE pending SET attempts = attempts + 1, in_flight = 0 WHERE id IN ({marks})", ids
+            )
+            self._conn.execute(
+                f"INSERT INTO failed (id, row, error) SELECT id, row, ? FROM pending "
+                f"WHERE id IN ({marks}) AND attempts >= ?", [repr(error), *ids, self.max_attempts]
+            )
+            self._conn.execute(f"DELETE FROM pending WHERE id IN ({marks}) AND attempts >= ?", [*ids, self.max_attempts])
+            self._conn.execute("COMMIT")
+
+    def _reconcile_in_flight(self):
+        # A crash or a timed-out `append_rows` leaves rows flagged in-flight
+        # without knowing whether they landed. Drop the ones that did.
+        with self._lock:
+            in_flight = self._conn.execute(
+                "SELECT id, row FROM pending WHERE in_flight = 1 ORDER BY id"
+            ).fetchall()
+        if not in_flight:
+            return
+
+        n = len(in_flight) + RECONCILE_WINDOW
+        if self.store.sharded:
+            # rows land in their page's worksheet; look at the tail of each
+            pages = {json.loads(r)[0] for _, r in in_flight}
+            already = {_row_key(r) for p in pages for r in self.store.tail(n, page_name=p)}
+        else:
+            already = {_row_key(r) for r in self.store.tail(n)}
+
+        landed = [i for i, r in in_flight if _row_key(json.loads(r)) in already]
+        with self._lock:
+            if landed:
+                self._conn.execute(
+                    f"DELETE FROM pending WHERE id IN ({','.join('?' * len(landed))})", landed
+                )
+            self._conn.execute("UPDATE pending SET in_flight = 0")
+
+
+def _is_retryable(e):
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status in (429, 500, 502, 503, 504)
+
+
+def _is_rejection(e):
+    # the store refused these rows; network errors, quotas and 5xx are not the rows' fault
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is not None:
+        return 400 <= status < 500 and status not in (408, 429)
+    return isinstance(e, (ValueError, TypeError, KeyError))
@@ -0,0 +1,159 @@
+import hashlib
+import threading
+import time
+
+
+def overlap_required(overlap, overlap_rate):
+    """
+    Returns a post_id -> required-annotators function. A stable `overlap_rate`
+    fraction of posts (picked by hashing the id) needs `overlap` distinct
+    annotators, for inter-annotator agreement; everything else needs one.
+    """
+    def required(post_id):
+        if overlap <= 1 or overlap_rate <= 0:
+            return 1
+        bucket = int(hashlib.sha1(str(post_id).encode()).hexdigest()[:8], 16) / 2 ** 32
+        return overlap if bucket < overlap_rate else 1
+    return required
+
+
+# ======================================================
+# WORK SCHEDULER
+# ======================================================
+class WorkScheduler:
+    """
+    Hands each session its own batch of posts so concurrent annotators do
+    not label the same item.
+
+    A claim is a lease that expires after `lease_seconds`; every rerun of the
+    owning session renews it, so leases of closed tabs fall back into the
+    pool on their own. A post can be leased to as many sessions as it still
+    needs labels (`index.required_labels` minus labels already recorded).
+
+    Only the head of a batch (the post on screen) is held firmly. When a
+    session finds nothing free, it takes over the tail of other batches, so
+    the last few posts of a page are still spread across annotators.
+    """
+
+    def __init__(self, index, lease_seconds=900, batch_size=6):
+        self.index = index
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._leases = {}      # (page_name, post_id) -> {session_id: expiry}
+        self._sessions = {}    # session_id -> (page_name, [post_id])
+
+    def busy(self, page_name, session_id, firm_only=True):
+        """
+        Posts on `page_name` whose remaining label slots are held by other
+        sessions: firmly (the post on their screen) or, with `firm_only`
+        false, anywhere in their batches.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                post_id
+                for (page, post_id), holders in self._leases.items()
+                if page == page_name and not self._has_capacity(page, post_id, holders, session_id, firm_only)
+            }
+
+    def claim(self, page_name, session_id, annotator, candidates, size=None):
+        """
+        Renew this session's leases and top its batch up from `candidates`
+        (post ids in preferred order) to `size` posts, `batch_size` by
+        default. Returns the batch, oldest claim first.
+        """
+        size = size or self.batch_size
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+
+            page, batch = self._sessions.get(session_id, (page_name, []))
+            if page != page_name:
+                batch = []
+            batch = [p for p in batch if not self.index.is_unavailable(page_name, p, annotator)]
+
+            candidates = [
+                p for p in candidates
+                if p not in batch and not self.index.is_unavailable(page_name, p, annotator)
+            ]
+            for post_id in candidates:
+                if len(batch) >= size:
+                    break
+                holders = self._leases.get((page_name, post_id), {})
+                if self._has_capacity(page_name, post_id, holders, session_id):
+                    batch.append(post_id)
+
+            if not batch:
+                # nothing free: take over a post queued behind another session's current one
+                for post_id in candidates:
+                    holders = self._leases.get((page_name, post_id), {})
+                    if self._has_capacity(page_name, post_id, holders, session_id, firm_only=True):
+                        self._steal(page_name, post_id, session_id)
+                        batch.append(post_id)
+                        break
+
+            self._release_session(session_id)
+            for post_id in batch:
+                self._leases.setdefault((page_name, post_id), {})[session_id] = now + self.lease_seconds
+            self._sessions[session_id] = (page_name, batch)
+            return list(batch)
+
+    def release(self, session_id, page_name, post_id):
+        with self._lock:
+            holders = self._leases.get((page_name, post_id))
+            if holders is not None:
+                holders.pop(session_id, None)
+                if not holders:
+                    del self._leases[(page_name, post_id)]
+            page, batch = self._sessions.get(session_id, (page_name, []))
+            if post_id in batch:
+                batch.remove(post_id)
+
+    def release_session(self, session_id):
+        with self._lock:
+            self._release_session(session_id)
+            self._sessions.pop(session_id, None)
+
+    # ---------------- internals ----------------
+    def _is_firm(self, session_id, post_id):
+        batch = self._sessions.get(session_id, (None, []))[1]
+        return bool(batch) and batch[0] == post_id
+
+    def _has_capacity(self, page_name, post_id, holders, session_id, firm_only=False):
+        others = sum(
+            1 for s in holders
+            if s != session_id and (not firm_only or self._is_firm(s, post_id))
+        )
+        needed = self.index.required_labels(post_id) - self.index.label_count(page_name, post_id)
+        return others < needed
+
+    def _steal(self, page_name, post_id, session_id):
+        holders = self._leases.get((page_name, post_id), {})
+        for other in [s for s in holders if s != session_id and not self._is_firm(s, post_id)]:
+            del holders[other]
+            self._sessions[other][1].remove(post_id)
+
+    def _release_session(self, session_id):
+        page, batch = self._sessions.get(session_id, (None, []))
+        for post_id in batch:
+            holders = self._leases.get((page, post_id))
+            if holders is not None:
+                holders.pop(session_id, None)
+                if not holders:
+                    del self._leases[(page, post_id)]
+
+    def _expire(self, now):
+        for key in list(self._leases):
+            holders = self._leases[key]
+            for session_id in [s for s, expiry in holders.items() if expiry <= now]:
+                del holders[session_id]
+            if not holders:
+                del self._leases[key]
+        for session_id, (page, batch) in list(self._sessions.items()):
+            alive = [p for p in batch if session_id in self._leases.get((page, p), ())]
+            if alive:
+                self._sessions[session_id] = (page, alive)
+            else:
+                del self._sessions[session_id]